@@ -0,0 +1,536 @@
+"""
+Reproducible benchmarks for the enhanced documentation server.
+Generates a synthetic markdown corpus from a seed, starts the server in-process
+against it and records latency percentiles and throughput per endpoint, cold
+(first request after the index is built) and warm, as JSON that can be diffed
+across commits.
+
+    python docs_bench.py run --documents 1000 --documents 10000 --output bench.json
+    python docs_bench.py generate /tmp/corpus --documents 5000
+    python docs_bench.py compare baseline.json bench.json --threshold 10
+"""
+
+import argparse
+import contextlib
+import http.client
+import itertools
+import json
+import math
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+from docs_index import document_id
+
+RESULTS_FORMAT = 1
+CORPUS_FORMAT = 1  # Bump when the generator changes so cached corpora are rebuilt
+CORPUS_CACHE = os.path.expanduser('~/.cache/enhanced-docs-browser/bench')
+DOCS_PER_DIRECTORY = 100
+LARGE_DOCUMENT_EVERY = 500  # Every Nth document is long enough for the lazy-section page
+REQUEST_TIMEOUT = 60
+MIN_COMPARE_SAMPLES = 5  # Fewer samples than this per side are reported but never gate
+
+_SYLLABLES = ('ka', 'lo', 'ri', 'men', 'tu', 'sa', 'vor', 'el', 'qui', 'dra', 'po', 'nex',
+              'ta', 'shi', 'gan', 'or', 'fel', 'mu', 'zi', 'bra')
+_COMMON = ('the', 'of', 'and', 'to', 'in', 'is', 'that', 'for', 'it', 'as', 'with', 'on',
+           'this', 'by', 'be', 'are', 'from', 'at', 'or', 'an', 'system', 'data', 'model',
+           'server', 'process', 'time', 'value', 'index', 'request', 'cache', 'function',
+           'memory', 'network', 'document', 'search', 'query', 'result', 'thread', 'state')
+_LANGUAGES = {
+    'python': "def {a}({b}):\n    {c} = [{b} for {b} in range(10)]\n    return sum({c})\n",
+    'javascript': "function {a}({b}) {{\n  const {c} = {b}.map(x => x * 2);\n  return {c};\n}}\n",
+    'bash': "for {b} in *.md; do\n  grep -c {a} \"${b}\" >> {c}.log\ndone\n",
+    'sql': "SELECT {a}, count(*) FROM {b}\nWHERE {c} IS NOT NULL\nGROUP BY {a};\n",
+}
+
+
+def vocabulary() -> List[str]:
+    """Fixed word list in frequency-rank order; independent of the corpus seed"""
+    rng = random.Random(0)
+    words = list(_COMMON)
+    seen = set(words)
+    while len(words) < 5000:
+        word = ''.join(rng.choice(_SYLLABLES) for _ in range(rng.randint(2, 4)))
+        if word not in seen:
+            seen.add(word)
+            words.append(word)
+    return words
+
+
+def search_queries(words: List[str]) -> List[str]:
+    """Queries spanning very common to rare terms, plus one that matches nothing"""
+    return [words[20], words[len(_COMMON) + 10], words[400], words[3000], 'zzyzxnomatch']
+
+
+class CorpusGenerator:
+    """Seeded markdown documents with headings, code fences, tables, lists and links"""
+
+    def __init__(self, seed: int = 1):
+        self.seed = seed
+        self.words = vocabulary()
+        # Zipf-distributed word choice, like natural text
+        weights = [1 / rank for rank in range(1, len(self.words) + 1)]
+        self.cum_weights = list(itertools.accumulate(weights))
+
+    def _words(self, rng: random.Random, count: int) -> List[str]:
+        return rng.choices(self.words, cum_weights=self.cum_weights, k=count)
+
+    def _sentence(self, rng: random.Random) -> str:
+        words = self._words(rng, rng.randint(6, 22))
+        return ' '.join(words).capitalize() + '.'
+
+    def _paragraph(self, rng: random.Random) -> str:
+        return ' '.join(self._sentence(rng) for _ in range(rng.randint(2, 7)))
+
+    def _code(self, rng: random.Random) -> str:
+        language = rng.choice(sorted(_LANGUAGES))
+        a, b, c = rng.sample(self.words[len(_COMMON):len(_COMMON) + 500], 3)
+        return f"```{language}\n{_LANGUAGES[language].format(a=a, b=b, c=c)}```"
+
+    def _table(self, rng: random.Random) -> str:
+        columns = rng.randint(2, 5)
+        header = [word.capitalize() for word in self._words(rng, columns)]
+        lines = ['| ' + ' | '.join(header) + ' |', '|' + '---|' * columns]
+        for _ in range(rng.randint(2, 12)):
+            cells = [str(rng.randint(0, 9999)) if rng.random() < 0.4 else ' '.join(self._words(rng, 2))
+                     for _ in range(columns)]
+            lines.append('| ' + ' | '.join(cells) + ' |')
+        return '\n'.join(lines)
+
+    def _list(self, rng: random.Random) -> str:
+        marker = rng.choice(('-', '*', '1.'))
+        return '\n'.join(f"{marker} {' '.join(self._words(rng, rng.randint(3, 10)))}"
+                         for _ in range(rng.randint(2, 8)))
+
+    def _block(self, rng: random.Random, links: List[str]) -> str:
+        roll = rng.random()
+        if roll < 0.55:
+            paragraph = self._paragraph(rng)
+            if links and rng.random() < 0.3:
+                paragraph += f" See [{self._words(rng, 1)[0]}]({rng.choice(links)})."
+            return paragraph
+        if roll < 0.7:
+            return self._code(rng)
+        if roll < 0.8:
+            return self._table(rng)
+        if roll < 0.93:
+            return self._list(rng)
+        return '> ' + self._sentence(rng)
+
+    def document(self, number: int, links: List[str]) -> str:
+        """Markdown for document `number`; the same seed and number always give the same text"""
+        rng = random.Random(self.seed * 1_000_003 + number)
+        title = ' '.join(self._words(rng, rng.randint(2, 6))).title()
+        if number % LARGE_DOCUMENT_EVERY == LARGE_DOCUMENT_EVERY - 1:
+            sections = 300
+        else:
+            sections = max(1, min(40, int(rng.lognormvariate(1.3, 0.7))))
+        parts = [f"# {title}", self._paragraph(rng)]
+        for index in range(sections):
+            level = '###' if index and rng.random() < 0.3 else '##'
+            parts.append(f"{level} {' '.join(self._words(rng, rng.randint(1, 5))).title()}")
+            parts.extend(self._block(rng, links) for _ in range(rng.randint(1, 6)))
+        return '\n\n'.join(parts) + '\n'
+
+    @staticmethod
+    def relative_path(number: int) -> str:
+        directory = number // DOCS_PER_DIRECTORY
+        return os.path.join(f"topic-{directory // DOCS_PER_DIRECTORY:03d}",
+                            f"part-{directory % DOCS_PER_DIRECTORY:02d}",
+                            f"doc-{number:06d}.md")
+
+    def generate(self, root: str, documents: int) -> Dict:
+        """Write the corpus under root and return its manifest"""
+        total_bytes = 0
+        for number in range(documents):
+            path = os.path.join(root, self.relative_path(number))
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            # Links point at earlier documents in the same directory
+            first = number - number % DOCS_PER_DIRECTORY
+            links = [os.path.basename(self.relative_path(other)) for other in range(first, number)][-5:]
+            text = self.document(number, links).encode()
+            with open(path, 'wb') as f:
+                f.write(text)
+            total_bytes += len(text)
+        manifest = {'format': CORPUS_FORMAT, 'seed': self.seed, 'documents': documents, 'bytes': total_bytes}
+        with open(os.path.join(root, '.bench-manifest.json'), 'w') as f:
+            json.dump(manifest, f)
+        return manifest
+
+
+def cached_corpus(documents: int, seed: int, cache_dir: str = CORPUS_CACHE) -> Tuple[str, Dict]:
+    """Generate a corpus once per (size, seed, generator format) and reuse it afterwards"""
+    root = os.path.join(cache_dir, f"corpus-v{CORPUS_FORMAT}-{documents}-{seed}")
+    manifest_path = os.path.join(root, '.bench-manifest.json')
+    if os.path.exists(manifest_path):
+        with open(manifest_path) as f:
+            return root, json.load(f)
+    os.makedirs(root, exist_ok=True)
+    return root, CorpusGenerator(seed).generate(root, documents)
+
+
+def summarize(samples: List[float], errors: int, seconds: float) -> Dict:
+    """Percentiles (nearest rank) and throughput for one endpoint phase; samples in ms"""
+    ordered = sorted(samples)
+
+    def percentile(p):
+        if not ordered:
+            return None
+        return round(ordered[max(0, math.ceil(p / 100 * len(ordered)) - 1)], 3)
+
+    return {
+        'count': len(ordered),
+        'errors': errors,
+        'p50_ms': percentile(50),
+        'p95_ms': percentile(95),
+        'p99_ms': percentile(99),
+        'mean_ms': round(sum(ordered) / len(ordered), 3) if ordered else None,
+        'max_ms': round(ordered[-1], 3) if ordered else None,
+        'throughput_rps': round(len(ordered) / seconds, 2) if seconds > 0 else None,
+        'samples_ms': [round(sample, 3) for sample in samples]
+    }
+
+
+class Client:
+    """One HTTP request per connection, timed from connect until the body is read"""
+
+    def __init__(self, host: str, port: int):
+        self.host = host
+        self.port = port
+
+    def request(self, method: str, path: str, body: Optional[bytes] = None) -> Tuple[float, int]:
+        started = time.perf_counter()
+        connection = http.client.HTTPConnection(self.host, self.port, timeout=REQUEST_TIMEOUT)
+        try:
+            headers = {'Content-Type': 'application/json'} if body is not None else {}
+            connection.request(method, path, body=body, headers=headers)
+            response = connection.getresponse()
+            response.read()
+            status = response.status
+        except (OSError, http.client.HTTPException):
+            status = 0
+        finally:
+            connection.close()
+        return (time.perf_counter() - started) * 1000, status
+
+    def run(self, requests: List[Tuple], concurrency: int = 1) -> Dict:
+        samples, errors = [], 0
+        started = time.perf_counter()
+        if concurrency > 1:
+            with ThreadPoolExecutor(max_workers=concurrency) as pool:
+                outcomes = list(pool.map(lambda request: self.request(*request), requests))
+        else:
+            outcomes = [self.request(*request) for request in requests]
+        seconds = time.perf_counter() - started
+        for elapsed, status in outcomes:
+            if 200 <= status < 400:
+                samples.append(elapsed)
+            else:
+                errors += 1
+        return summarize(samples, errors, seconds)
+
+
+def endpoint_requests(ids: List[str], large_ids: List[str], queries: List[str], sample: int,
+                      rng: random.Random) -> Dict[str, List[Tuple]]:
+    """Requests per endpoint; per-document endpoints get disjoint documents so no cold pass warms another"""
+    per_document = ('doc', 'doc_raw', 'doc_sections', 'doc_section', 'batch')
+    chosen = rng.sample(ids, min(len(ids), sample * len(per_document)))
+    groups = {name: chosen[index::len(per_document)] for index, name in enumerate(per_document)}
+    batch = json.dumps({'documents': groups['batch'], 'representations': ['rendered', 'toc']}).encode()
+
+    plan = {
+        'index': [('GET', '/')],
+        'healthz': [('GET', '/healthz')],
+        'api_files': [('GET', '/api/files')],
+        'api_file_changes': [('GET', '/api/files/changes')],
+        'content_analysis': [('GET', '/api/content-analysis')],
+        'index_stats': [('GET', '/api/index-stats')],
+        'metrics': [('GET', '/metrics')],
+        'api_search': [('GET', f'/api/search?q={query}') for query in queries],
+        'api_search_stream': [('GET', f'/api/search/stream?q={query}') for query in queries],
+        'doc': [('GET', f'/doc/{key}') for key in groups['doc']],
+        'doc_raw': [('GET', f'/doc/{key}/raw') for key in groups['doc_raw']],
+        'doc_sections': [('GET', f'/api/doc/{key}/sections') for key in groups['doc_sections']],
+        'doc_section': [('GET', f'/api/doc/{key}/section/0') for key in groups['doc_section']],
+        'batch': [('POST', '/api/batch', batch)],
+    }
+    if large_ids:
+        plan['doc_large'] = [('GET', f'/doc/{key}') for key in large_ids[:sample]]
+    return plan
+
+
+def progress(message: str):
+    # The server's own output is redirected to a log file while it runs in-process
+    print(message, file=sys.__stderr__, flush=True)
+
+
+def run_single(documents: int, seed: int, rounds: int, sample: int, concurrency: int,
+               endpoints: Optional[List[str]] = None, cache_dir: str = CORPUS_CACHE) -> Dict:
+    """Benchmark one corpus size against a server started in this process"""
+    progress(f"corpus: {documents} documents (seed {seed})")
+    started = time.perf_counter()
+    root, manifest = cached_corpus(documents, seed, cache_dir)
+    generate_seconds = time.perf_counter() - started
+
+    work_dir = tempfile.mkdtemp(prefix='docs-bench-')
+    # The server reads its configuration from the environment at import time
+    os.environ['DOCS_ROOT'] = root
+    os.environ['DOCS_INDEX_SNAPSHOT'] = os.path.join(work_dir, 'index.snapshot')
+    log_path = os.path.join(work_dir, 'server.log')
+    with open(log_path, 'w') as log, contextlib.redirect_stdout(log), contextlib.redirect_stderr(log):
+        import enhanced_docs_server as server
+
+        httpd = server.DocsHTTPServer(('127.0.0.1', 0), server.EnhancedDocsHandler)
+        server.event_hub.start()
+        threading.Thread(target=httpd.serve_forever, name='bench-server', daemon=True).start()
+        started = time.perf_counter()
+        server.warm_up()
+        index_seconds = time.perf_counter() - started
+        if not server.warmup['ready']:
+            raise RuntimeError(f"Server warm-up failed: {server.warmup['error']} (see {log_path})")
+
+        with server.corpus_index.acquire() as generation:
+            ids = sorted(doc.id for doc in generation.documents)
+        large_ids = [document_id(CorpusGenerator.relative_path(number))
+                     for number in range(LARGE_DOCUMENT_EVERY - 1, documents, LARGE_DOCUMENT_EVERY)]
+        ids = sorted(set(ids) - set(large_ids))
+
+        rng = random.Random(seed)
+        plan = endpoint_requests(ids, large_ids, search_queries(vocabulary()), sample, rng)
+        client = Client(*httpd.server_address[:2])
+        results = {}
+        try:
+            for name, requests in plan.items():
+                if endpoints and name not in endpoints:
+                    continue
+                cold = client.run(requests)
+                warm = client.run(requests * rounds, concurrency)
+                results[name] = {'cold': cold, 'warm': warm}
+                progress(f"  {name:18} cold p50 {cold['p50_ms']} ms   warm p50 {warm['p50_ms']} "
+                         f"p99 {warm['p99_ms']} ms   {warm['throughput_rps']} req/s")
+        finally:
+            httpd.shutdown()
+            httpd.server_close()
+
+    return {
+        'documents': documents,
+        'seed': seed,
+        'corpus_bytes': manifest['bytes'],
+        'corpus_generate_seconds': round(generate_seconds, 3),
+        'index_seconds': round(index_seconds, 3),
+        'endpoints': results
+    }
+
+
+def environment() -> Dict:
+    def git(*args):
+        try:
+            return subprocess.run(['git', *args], capture_output=True, text=True, timeout=10,
+                                  cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+        except (OSError, subprocess.SubprocessError):
+            return ''
+
+    return {
+        'commit': git('rev-parse', 'HEAD'),
+        'dirty': bool(git('status', '--porcelain', '--untracked-files=no')),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpus': os.cpu_count(),
+        'started_at': time.strftime('%Y-%m-%dT%H:%M:%S%z')
+    }
+
+
+def run(sizes: List[int], seed: int, rounds: int, sample: int, concurrency: int,
+        endpoints: Optional[List[str]], cache_dir: str) -> Dict:
+    """Benchmark every corpus size; each size after the first gets a fresh process"""
+    settings = {'seed': seed, 'rounds': rounds, 'sample': sample, 'concurrency': concurrency}
+    results = {'format': RESULTS_FORMAT, 'meta': environment(), 'settings': settings, 'runs': []}
+    if len(sizes) == 1:
+        results['runs'].append(run_single(sizes[0], seed, rounds, sample, concurrency, endpoints, cache_dir))
+        return results
+
+    # The server keeps its corpus in module globals, so one process serves one corpus
+    for size in sizes:
+        with tempfile.NamedTemporaryFile(suffix='.json', delete=False) as part:
+            part_path = part.name
+        command = [sys.executable, os.path.abspath(__file__), 'run', '--documents', str(size),
+                   '--seed', str(seed), '--rounds', str(rounds), '--sample', str(sample),
+                   '--concurrency', str(concurrency), '--cache-dir', cache_dir, '--output', part_path]
+        for name in endpoints or ():
+            command += ['--endpoint', name]
+        subprocess.run(command, check=True)
+        with open(part_path) as f:
+            results['runs'].extend(json.load(f)['runs'])
+        os.unlink(part_path)
+    return results
+
+
+def mann_whitney(baseline: List[float], candidate: List[float]) -> Tuple[float, float]:
+    """One-sided Mann-Whitney U test that candidate samples tend to be larger than baseline ones.
+    Returns (probability a candidate sample exceeds a baseline sample, p-value), using the
+    normal approximation with tie and continuity corrections."""
+    n1, n2 = len(baseline), len(candidate)
+    combined = sorted([(value, 0) for value in baseline] + [(value, 1) for value in candidate])
+    candidate_ranks = 0.0
+    tie_term = 0
+    index = 0
+    while index < len(combined):
+        end = index
+        while end + 1 < len(combined) and combined[end + 1][0] == combined[index][0]:
+            end += 1
+        rank = (index + end) / 2 + 1  # Tied values share their average rank
+        candidate_ranks += rank * sum(1 for _, group in combined[index:end + 1] if group)
+        ties = end - index + 1
+        tie_term += ties ** 3 - ties
+        index = end + 1
+
+    u = candidate_ranks - n2 * (n2 + 1) / 2
+    n = n1 + n2
+    variance = n1 * n2 / 12 * ((n + 1) - tie_term / (n * (n - 1)))
+    if variance <= 0:
+        return u / (n1 * n2), 1.0  # Every sample identical
+    z = (u - n1 * n2 / 2 - 0.5) / math.sqrt(variance)
+    return u / (n1 * n2), 1 - statistics.NormalDist().cdf(z)
+
+
+def compare_results(baseline: Dict, candidate: Dict, threshold: float = 10.0, alpha: float = 0.01,
+                    phases: Tuple[str, ...] = ('warm',), metric: str = 'p50_ms') -> List[Dict]:
+    """Per corpus size, endpoint and phase: the change in `metric` and whether it is a regression.
+    A regression must be both statistically significant (Mann-Whitney, one-sided, at alpha)
+    and larger than `threshold` percent, so noise alone does not fail the gate."""
+    base_runs = {run['documents']: run for run in baseline['runs']}
+    rows = []
+    for run in candidate['runs']:
+        base_run = base_runs.get(run['documents'])
+        names = sorted(set(run['endpoints']) | set(base_run['endpoints'] if base_run else ()))
+        for name in names:
+            for phase in phases:
+                row = {'documents': run['documents'], 'endpoint': name, 'phase': phase}
+                rows.append(row)
+                old = base_run['endpoints'].get(name, {}).get(phase) if base_run else None
+                new = run['endpoints'].get(name, {}).get(phase)
+                if old is None or new is None:
+                    row['verdict'] = 'only in candidate' if old is None else 'only in baseline'
+                    continue
+
+                row.update(base=old[metric], new=new[metric], base_errors=old['errors'], new_errors=new['errors'])
+                if old[metric] and new[metric] is not None:
+                    row['change_pct'] = round((new[metric] - old[metric]) / old[metric] * 100, 1)
+                if new['errors'] > old['errors']:
+                    row['verdict'] = 'REGRESSION'
+                    row['reason'] = f"errors {old['errors']} -> {new['errors']}"
+                    continue
+                if min(len(old['samples_ms']), len(new['samples_ms'])) < MIN_COMPARE_SAMPLES:
+                    row['verdict'] = 'too few samples'
+                    continue
+
+                row['p_slower'], row['p_value'] = mann_whitney(old['samples_ms'], new['samples_ms'])
+                _, p_faster = mann_whitney(new['samples_ms'], old['samples_ms'])
+                change = row.get('change_pct', 0.0)
+                if row['p_value'] < alpha and change > threshold:
+                    row['verdict'] = 'REGRESSION'
+                elif p_faster < alpha and change < -threshold:
+                    row['verdict'] = 'improved'
+                else:
+                    row['verdict'] = 'ok'
+    return rows
+
+
+def print_comparison(rows: List[Dict], metric: str):
+    label = metric.replace('_ms', '')
+    header = (f"{'docs':>7}  {'endpoint':18} {'phase':5} {'base ' + label:>10} {'new ' + label:>10} "
+              f"{'change':>8} {'p-value':>8}  verdict")
+    print(header)
+    print('-' * len(header))
+
+    def cell(value, suffix=''):
+        return '-' if value is None else f"{value}{suffix}"
+
+    for row in rows:
+        change = row.get('change_pct')
+        p_value = row.get('p_value')
+        verdict = row['verdict'] + (f" ({row['reason']})" if 'reason' in row else '')
+        print(f"{row['documents']:>7}  {row['endpoint']:18} {row['phase']:5} {cell(row.get('base')):>10} "
+              f"{cell(row.get('new')):>10} {'-' if change is None else f'{change:+.1f}%':>8} "
+              f"{'-' if p_value is None else f'{p_value:.4f}':>8}  {verdict}")
+
+
+def comparable(baseline: Dict, candidate: Dict) -> List[str]:
+    """Differences between two runs' settings or hosts that make the comparison unreliable"""
+    warnings = []
+    for key in ('rounds', 'sample', 'concurrency', 'seed'):
+        if baseline['settings'].get(key) != candidate['settings'].get(key):
+            warnings.append(f"{key} differs: {baseline['settings'].get(key)} vs {candidate['settings'].get(key)}")
+    for key in ('platform', 'cpus', 'python'):
+        if baseline['meta'].get(key) != candidate['meta'].get(key):
+            warnings.append(f"{key} differs: {baseline['meta'].get(key)} vs {candidate['meta'].get(key)}")
+    return warnings
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the enhanced documentation server")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    generate = commands.add_parser('generate', help="Write a synthetic corpus")
+    generate.add_argument('out_dir')
+    generate.add_argument('--documents', type=int, default=1000)
+    generate.add_argument('--seed', type=int, default=1)
+
+    bench = commands.add_parser('run', help="Benchmark the server against synthetic corpora")
+    bench.add_argument('--documents', type=int, action='append', metavar='N',
+                       help="Corpus size; repeat for several sizes (default: 1000)")
+    bench.add_argument('--seed', type=int, default=1)
+    bench.add_argument('--rounds', type=int, default=5, help="Warm passes over each endpoint's requests")
+    bench.add_argument('--sample', type=int, default=20, help="Documents per per-document endpoint")
+    bench.add_argument('--concurrency', type=int, default=1, help="Client threads in the warm phase")
+    bench.add_argument('--endpoint', action='append', metavar='NAME', help="Only benchmark these endpoints")
+    bench.add_argument('--cache-dir', default=CORPUS_CACHE, help="Where generated corpora are kept")
+    bench.add_argument('--output', default='bench-results.json')
+
+    compare = commands.add_parser('compare', help="Flag regressions between two results files")
+    compare.add_argument('baseline')
+    compare.add_argument('candidate')
+    compare.add_argument('--threshold', type=float, default=10.0,
+                         help="Percent slowdown that counts as a regression when significant (default: 10)")
+    compare.add_argument('--alpha', type=float, default=0.01, help="Significance level (default: 0.01)")
+    compare.add_argument('--metric', choices=('p50_ms', 'p95_ms', 'p99_ms', 'mean_ms'), default='p50_ms')
+    compare.add_argument('--phase', choices=('warm', 'cold', 'all'), default='warm')
+    args = parser.parse_args()
+
+    if args.command == 'generate':
+        manifest = CorpusGenerator(args.seed).generate(args.out_dir, args.documents)
+        print(f"Wrote {manifest['documents']} documents ({manifest['bytes']} bytes) to {args.out_dir}")
+        return
+
+    if args.command == 'compare':
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        with open(args.candidate) as f:
+            candidate = json.load(f)
+        for warning in comparable(baseline, candidate):
+            print(f"warning: {warning}", file=sys.stderr)
+        phases = ('cold', 'warm') if args.phase == 'all' else (args.phase,)
+        rows = compare_results(baseline, candidate, args.threshold, args.alpha, phases, args.metric)
+        print_comparison(rows, args.metric)
+        regressions = [row for row in rows if row['verdict'] == 'REGRESSION']
+        print(f"\n{len(regressions)} regression(s) beyond {args.threshold:g}% at alpha {args.alpha:g}; "
+              f"baseline {baseline['meta'].get('commit', '?')[:12]}, candidate {candidate['meta'].get('commit', '?')[:12]}")
+        raise SystemExit(1 if regressions else 0)
+
+    results = run(args.documents or [1000], args.seed, args.rounds, args.sample, args.concurrency,
+                  args.endpoint, args.cache_dir)
+    with open(args.output, 'w') as f:
+        json.dump(results, f)
+    print(f"Results written to {args.output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,161 @@
+"""
+Server-Sent Events hub for the enhanced documentation server.
+Streams are handed off by their request threads to one selector loop, so idle
+subscribers cost a socket and a small buffer rather than a thread each.
+"""
+
+import json
+import selectors
+import socket
+import threading
+import time
+from collections import deque
+from typing import Dict, Optional
+
+HEARTBEAT_INTERVAL = 15  # Seconds between keep-alive comments on idle streams
+MAX_CLIENT_BUFFER = 256 * 1024  # Unsent bytes before a slow subscriber is dropped
+MAX_CLIENTS = 1024
+REPLAY_EVENTS = 1000  # Recent events kept for Last-Event-ID reconnects
+
+
+class _Client:
+    __slots__ = ('sock', 'buffer')
+
+    def __init__(self, sock: socket.socket, buffer: bytearray):
+        self.sock = sock
+        self.buffer = buffer
+
+
+class EventHub:
+    """Fan events out to SSE subscribers from a single selector thread"""
+
+    def __init__(self):
+        self.sequence = 0
+        self.dropped = 0
+        self._recent: deque = deque(maxlen=REPLAY_EVENTS)
+        self._clients: Dict[int, _Client] = {}
+        self._closing = []  # Dropped subscribers, closed by the selector thread
+        self._lock = threading.Lock()
+        self._selector = selectors.DefaultSelector()
+        self._wake_r, self._wake_w = socket.socketpair()
+        self._wake_r.setblocking(False)
+        self._wake_w.setblocking(False)
+        self._selector.register(self._wake_r, selectors.EVENT_READ)
+        self._thread = None
+
+    def __len__(self) -> int:
+        return len(self._clients)
+
+    def start(self):
+        self._thread = threading.Thread(target=self._loop, name='event-hub', daemon=True)
+        self._thread.start()
+
+    @property
+    def full(self) -> bool:
+        return len(self._clients) >= MAX_CLIENTS
+
+    def subscribe(self, sock: socket.socket, last_event_id: Optional[str] = None):
+        """Take ownership of a socket whose SSE response headers were already sent"""
+        buffer = bytearray(b'retry: 3000\n\n')
+        with self._lock:
+            if last_event_id and last_event_id.isdigit():
+                since = int(last_event_id)
+                oldest = self._recent[0][0] if self._recent else self.sequence + 1
+                if since > self.sequence or since + 1 < oldest:
+                    # From before a restart or too far behind: resync from /api/files/changes
+                    buffer += self._frame(self.sequence, 'reset', {'reason': 'history expired'})
+                else:
+                    for sequence, frame in self._recent:
+                        if sequence > since:
+                            buffer += frame
+            sock.setblocking(False)
+            self._clients[sock.fileno()] = _Client(sock, buffer)
+        self._wake()
+
+    def publish(self, event: str, data: Dict):
+        """Queue an event for every subscriber; subscribers too far behind are dropped"""
+        with self._lock:
+            self.sequence += 1
+            frame = self._frame(self.sequence, event, data)
+            self._recent.append((self.sequence, frame))
+            for client in list(self._clients.values()):
+                if len(client.buffer) + len(frame) > MAX_CLIENT_BUFFER:
+                    self._drop(client)
+                else:
+                    client.buffer += frame
+        self._wake()
+
+    @staticmethod
+    def _frame(sequence: int, event: str, data: Dict) -> bytes:
+        return f"id: {sequence}\nevent: {event}\ndata: {json.dumps(data)}\n\n".encode()
+
+    def _wake(self):
+        try:
+            self._wake_w.send(b'\0')
+        except (BlockingIOError, OSError):
+            pass  # A wake-up is already pending
+
+    def _drop(self, client: _Client):
+        # Caller holds self._lock; the selector is only touched from the hub thread
+        if self._clients.pop(client.sock.fileno(), None) is not None:
+            self._closing.append(client)
+            self.dropped += 1
+
+    def _loop(self):
+        last_heartbeat = time.monotonic()
+        while True:
+            with self._lock:
+                for client in self._closing:
+                    try:
+                        self._selector.unregister(client.sock)
+                    except (KeyError, ValueError):
+                        pass
+                    client.sock.close()
+                self._closing.clear()
+                for client in list(self._clients.values()):
+                    # Watch for writability only while there is something to send
+                    events = selectors.EVENT_READ | (selectors.EVENT_WRITE if client.buffer else 0)
+                    try:
+                        self._selector.modify(client.sock, events)
+                    except KeyError:
+                        self._selector.register(client.sock, events)
+
+            for key, mask in self._selector.select(timeout=HEARTBEAT_INTERVAL):
+                if key.fileobj is self._wake_r:
+                    try:
+                        while self._wake_r.recv(4096):
+                            pass
+                    except BlockingIOError:
+                        pass
+                    continue
+                with self._lock:
+                    client = self._clients.get(key.fd)
+                    if client is None:
+                        continue
+                    if mask & selectors.EVENT_READ:
+                        # Subscribers never send anything after the request; readable means closed
+                        try:
+                            if not client.sock.recv(4096):
+                                self._drop(client)
+                                continue
+                        except BlockingIOError:
+                            pass
+                        except OSError:
+                            self._drop(client)
+                            continue
+                    if mask & selectors.EVENT_WRITE and client.buffer:
+                        try:
+                            sent = client.sock.send(client.buffer)
+                            del client.buffer[:sent]
+                        except BlockingIOError:
+                            pass
+                        except OSError:
+                            self._drop(client)
+
+            now = time.monotonic()
+            if now - last_heartbeat >= HEARTBEAT_INTERVAL:
+                last_heartbeat = now
+                with self._lock:
+                    for client in list(self._clients.values()):
+                        if not client.buffer:
+                            client.buffer += b': heartbeat\n\n'
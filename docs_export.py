@@ -0,0 +1,147 @@
+"""
+Static-site export for the enhanced documentation server.
+Renders every markdown file through the page template into an output directory that
+nginx can serve directly, under both its /doc/<id> and its path URL, with precompressed
+.gz/.br siblings and a content manifest.
+"""
+
+import gzip
+import hashlib
+import json
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Dict, List, Optional
+
+import docs_render
+from docs_index import discover_markdown_files, document_id
+
+try:
+    import brotli
+except ImportError:  # Optional: only .gz siblings are written without it
+    brotli = None
+
+MANIFEST_NAME = 'manifest.json'
+MANIFEST_FORMAT = 2  # 2: pages are also written to doc/<id>.html
+
+
+def template_hash() -> str:
+    """Changing the page template or extensions invalidates every exported page"""
+    source = docs_render.PAGE_TEMPLATE + repr(docs_render.MARKDOWN_EXTENSIONS)
+    return hashlib.sha256(source.encode('utf-8')).hexdigest()[:16]
+
+
+def _write_atomic(path: str, data: bytes):
+    tmp_path = f"{path}.tmp{os.getpid()}"
+    with open(tmp_path, 'wb') as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+
+def _outputs(out_dir: str, relative: str) -> List[str]:
+    """Page files for a document: doc/<id>.html for the canonical URL, <relative>.html for /file/"""
+    return [os.path.join(out_dir, 'doc', document_id(relative) + '.html'),
+            os.path.join(out_dir, relative + '.html')]
+
+
+def _export_file(source: str, outputs: List[str]) -> Dict:
+    """Process-pool task: render one document and write each page with its compressed siblings"""
+    with open(source, 'rb') as f:
+        raw = f.read()
+    html_content, _ = docs_render.render_blocks(raw.decode('utf-8', errors='replace'))
+    page = docs_render.render_page(source, html_content).encode('utf-8')
+
+    compressed = gzip.compress(page, compresslevel=9, mtime=0)
+    compressed_br = brotli.compress(page) if brotli is not None else None
+    for output in outputs:
+        os.makedirs(os.path.dirname(output), exist_ok=True)
+        _write_atomic(output, page)
+        _write_atomic(output + '.gz', compressed)
+        if compressed_br is not None:
+            _write_atomic(output + '.br', compressed_br)
+
+    return {
+        'source_sha256': hashlib.sha256(raw).hexdigest(),
+        'sha256': hashlib.sha256(page).hexdigest(),
+        'bytes': len(page)
+    }
+
+
+def export_site(root: str, out_dir: str, workers: Optional[int] = None, force: bool = False) -> Dict:
+    """Render the corpus under root into out_dir, re-rendering only changed documents"""
+    out_dir = os.path.abspath(out_dir)
+    manifest_path = os.path.join(out_dir, MANIFEST_NAME)
+    previous = {}
+    if not force:
+        try:
+            with open(manifest_path, 'r', encoding='utf-8') as f:
+                manifest = json.load(f)
+            if manifest.get('format') == MANIFEST_FORMAT and manifest.get('template') == template_hash():
+                previous = manifest.get('files', {})
+        except (OSError, ValueError):
+            previous = {}
+
+    files = {}
+    jobs = {}
+    for source in discover_markdown_files(root):
+        relative = os.path.relpath(source, root)
+        outputs = _outputs(out_dir, relative)
+        old = previous.get(relative)
+        if old and all(os.path.exists(output) for output in outputs):
+            with open(source, 'rb') as f:
+                if hashlib.sha256(f.read()).hexdigest() == old['source_sha256']:
+                    files[relative] = old
+                    continue
+        jobs[relative] = (source, outputs)
+
+    started = time.time()
+    failed = 0
+    print(f"📦 Exporting {len(jobs)} changed of {len(jobs) + len(files)} documents to {out_dir}")
+    if jobs:
+        workers = workers or os.cpu_count() or 1
+        context = multiprocessing.get_context('spawn')
+        with ProcessPoolExecutor(max_workers=workers, mp_context=context) as pool:
+            futures = {pool.submit(_export_file, source, outputs): relative
+                       for relative, (source, outputs) in jobs.items()}
+            for done, future in enumerate(as_completed(futures), 1):
+                relative = futures[future]
+                try:
+                    files[relative] = future.result()
+                except Exception as e:
+                    failed += 1
+                    print(f"   ⚠️  {relative}: {e}")
+                if done % 100 == 0:
+                    print(f"   {done}/{len(jobs)} rendered")
+
+    # Drop pages whose source has been deleted
+    removed = 0
+    for relative in set(previous) - set(files) - set(jobs):
+        for output in _outputs(out_dir, relative):
+            for path in (output, output + '.gz', output + '.br'):
+                if os.path.exists(path):
+                    os.unlink(path)
+        removed += 1
+
+    manifest = {
+        'format': MANIFEST_FORMAT,
+        'template': template_hash(),
+        'root': os.path.abspath(root),
+        'generated': time.time(),
+        'files': dict(sorted(files.items()))
+    }
+    os.makedirs(out_dir, exist_ok=True)
+    _write_atomic(manifest_path, json.dumps(manifest, indent=2).encode('utf-8'))
+
+    summary = {
+        'rendered': len(jobs) - failed,
+        'unchanged': len(files) - (len(jobs) - failed),
+        'removed': removed,
+        'failed': failed,
+        'seconds': round(time.time() - started, 2)
+    }
+    print(f"✅ Export finished: {summary['rendered']} rendered, {summary['unchanged']} unchanged, "
+          f"{summary['removed']} removed, {summary['failed']} failed in {summary['seconds']}s")
+    if brotli is None:
+        print("   (brotli not installed: .br siblings skipped)")
+    return summary
@@ -0,0 +1,540 @@
+"""
+Corpus index for the enhanced documentation server.
+Builds generations of the markdown corpus in the background and swaps them in atomically,
+so requests never see a half-built index.
+"""
+
+import hashlib
+import json
+import mmap
+import os
+import struct
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from array import array
+from collections import deque
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Optional
+
+REINDEX_INTERVAL = 60  # Seconds between background rebuild checks
+RESOLVE_CACHE_ENTRIES = 65536  # Client path spellings remembered per generation
+CHANGE_LOG_VERSIONS = 1000  # Rebuilds kept for delta sync; older clients get a full reset
+
+DOCUMENT_TYPES = ('roadmap', 'technical', 'essay', 'analysis', 'project', 'memo')
+
+SNAPSHOT_MAGIC = b'EDBINDEX'
+SNAPSHOT_FORMAT = 1  # Bump whenever the on-disk layout changes
+SNAPSHOT_COLUMNS = ('dir_ids', 'sizes', 'mtimes', 'types', 'offsets', 'lengths')
+
+
+def discover_markdown_files(root: str) -> List[str]:
+    """List markdown files under root using ripgrep, falling back to os.walk"""
+    try:
+        result = subprocess.run([
+            'rg', '--files', '--type', 'md', root
+        ], capture_output=True, text=True, timeout=10)
+        return [line.strip() for line in result.stdout.strip().split('\n') if line.strip()]
+    except FileNotFoundError:
+        pass
+
+    paths = []
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames[:] = [d for d in dirnames if not d.startswith('.')]
+        for filename in filenames:
+            if filename.endswith('.md'):
+                paths.append(os.path.join(dirpath, filename))
+    return paths
+
+
+def document_id(relative_path: str) -> str:
+    """Stable short id for a document: a hash of its path relative to the corpus root"""
+    return hashlib.blake2b(relative_path.encode('utf-8'), digest_size=6).hexdigest()
+
+
+def classify_document(filename: str) -> str:
+    """Semantic cluster type from filename heuristics"""
+    filename = filename.lower()
+    if 'roadmap' in filename or 'plan' in filename:
+        return 'roadmap'
+    elif 'technical' in filename or 'architecture' in filename or 'api' in filename:
+        return 'technical'
+    elif 'essay' in filename or 'thought' in filename:
+        return 'essay'
+    elif 'analysis' in filename or 'report' in filename or 'assessment' in filename:
+        return 'analysis'
+    elif 'project' in filename or 'implementation' in filename:
+        return 'project'
+    elif 'memo' in filename or 'note' in filename or 'brief' in filename:
+        return 'memo'
+    return 'technical'
+
+
+class Document:
+    """Lightweight view of one document inside a DocumentStore"""
+    __slots__ = ('store', 'index')
+
+    def __init__(self, store: 'DocumentStore', index: int):
+        self.store = store
+        self.index = index
+
+    @property
+    def id(self) -> str:
+        return self.store.ids[self.index]
+
+    @property
+    def name(self) -> str:
+        return self.store.names[self.index]
+
+    @property
+    def path(self) -> str:
+        store = self.store
+        return os.path.join(store.dirs[store.dir_ids[self.index]], store.names[self.index])
+
+    @property
+    def mtime(self) -> float:
+        return self.store.mtimes[self.index]
+
+    @property
+    def size(self) -> int:
+        return self.store.sizes[self.index]
+
+    @property
+    def type(self) -> str:
+        return DOCUMENT_TYPES[self.store.types[self.index]]
+
+    @property
+    def raw(self) -> bytes:
+        return self.store.raw(self.index)
+
+    @property
+    def content(self) -> str:
+        return self.raw.decode('utf-8', errors='replace')
+
+
+class DocumentStore:
+    """Compact column store: interned path components, parallel arrays and one text buffer"""
+
+    def __init__(self):
+        self.dirs: List[str] = []
+        self._dir_ids: Dict[str, int] = {}
+        self.dir_ids = array('I')
+        self.names: List[str] = []
+        self.sizes = array('q')
+        self.mtimes = array('d')
+        self.types = array('B')
+        self.offsets = array('Q')
+        self.lengths = array('Q')
+        self.buffer = bytearray()
+        self.ids: List[str] = []  # Derived from paths when a generation is built
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def __getitem__(self, index: int) -> Document:
+        if not 0 <= index < len(self.names):
+            raise IndexError(index)
+        return Document(self, index)
+
+    def __iter__(self) -> Iterator[Document]:
+        for index in range(len(self.names)):
+            yield Document(self, index)
+
+    def append(self, path: str, mtime: float, size: int, doc_type: str, raw: bytes) -> int:
+        directory, name = os.path.split(path)
+        dir_id = self._dir_ids.get(directory)
+        if dir_id is None:
+            dir_id = self._dir_ids[directory] = len(self.dirs)
+            self.dirs.append(sys.intern(directory))
+
+        self.dir_ids.append(dir_id)
+        self.names.append(sys.intern(name))
+        self.sizes.append(size)
+        self.mtimes.append(mtime)
+        self.types.append(DOCUMENT_TYPES.index(doc_type))
+        self.offsets.append(len(self.buffer))
+        self.lengths.append(len(raw))
+        self.buffer += raw
+        return len(self.names) - 1
+
+    def raw(self, index: int) -> bytes:
+        offset = self.offsets[index]
+        return bytes(self.buffer[offset:offset + self.lengths[index]])
+
+    def memory_report(self) -> Dict[str, float]:
+        """Approximate resident bytes of the store, in total and per document"""
+        columns = (self.dir_ids, self.sizes, self.mtimes, self.types, self.offsets, self.lengths)
+        array_bytes = sum(column.buffer_info()[1] * column.itemsize for column in columns)
+        string_bytes = sum(sys.getsizeof(s) for s in self.names) + sum(sys.getsizeof(d) for d in self.dirs)
+        container_bytes = sys.getsizeof(self.names) + sys.getsizeof(self.dirs) + sys.getsizeof(self._dir_ids)
+        text_bytes = len(self.buffer)
+        total = array_bytes + string_bytes + container_bytes + text_bytes
+        count = len(self.names)
+        return {
+            'documents': count,
+            'text_bytes': text_bytes,
+            'array_bytes': array_bytes,
+            'string_bytes': string_bytes,
+            'container_bytes': container_bytes,
+            'total_bytes': total,
+            'bytes_per_document': round(total / count, 1) if count else 0,
+            'overhead_per_document': round((total - text_bytes) / count, 1) if count else 0
+        }
+
+
+class IndexGeneration:
+    """One immutable build of the corpus, shared by every request answered from it"""
+
+    def __init__(self, version: int, documents: DocumentStore, root: str):
+        self.version = version
+        self.documents = documents
+        self.by_path = {doc.path: doc.index for doc in documents}
+        documents.ids = [document_id(os.path.relpath(path, root)) for path in self.by_path]
+        self.by_id = {doc_id: index for index, doc_id in enumerate(documents.ids)}
+        self.root = root
+        self._resolved: Dict[str, Optional[int]] = {}
+        self.built_at = time.time()
+        self.retired = False
+        self._refs = 0
+        self._lock = threading.Lock()
+
+    def get(self, path: str) -> Optional[Document]:
+        index = self.by_path.get(path)
+        return self.documents[index] if index is not None else None
+
+    def get_by_id(self, doc_id: str) -> Optional[Document]:
+        index = self.by_id.get(doc_id)
+        return self.documents[index] if index is not None else None
+
+    def resolve(self, requested: str) -> Optional[Document]:
+        """Document for a client-supplied path, canonicalized once per generation"""
+        try:
+            index = self._resolved[requested]
+        except KeyError:
+            index = self.by_path.get(requested)
+            if index is None:
+                index = self.by_path.get(os.path.normpath(os.path.join(self.root, requested)))
+            if len(self._resolved) >= RESOLVE_CACHE_ENTRIES:
+                self._resolved.clear()
+            self._resolved[requested] = index
+        return self.documents[index] if index is not None else None
+
+    def memory_report(self) -> Dict[str, float]:
+        """Store report plus the path lookup table"""
+        report = self.documents.memory_report()
+        path_index_bytes = (sys.getsizeof(self.by_path) + sum(sys.getsizeof(p) for p in self.by_path)
+                            + sys.getsizeof(self.by_id) + sum(sys.getsizeof(i) for i in self.by_id))
+        report['path_index_bytes'] = path_index_bytes
+        report['total_bytes'] += path_index_bytes
+        count = report['documents']
+        if count:
+            report['bytes_per_document'] = round(report['total_bytes'] / count, 1)
+            report['overhead_per_document'] = round((report['total_bytes'] - report['text_bytes']) / count, 1)
+        return report
+
+    def acquire(self):
+        with self._lock:
+            self._refs += 1
+
+    def release(self):
+        with self._lock:
+            self._refs -= 1
+            drained = self.retired and self._refs == 0
+        if drained:
+            self._drop()
+
+    def retire(self):
+        """Mark as superseded; storage is dropped once in-flight requests drain"""
+        with self._lock:
+            self.retired = True
+            drained = self._refs == 0
+        if drained:
+            self._drop()
+
+    def _drop(self):
+        self.documents = DocumentStore()
+        self.by_path = {}
+        self.by_id = {}
+        self._resolved = {}
+
+
+def _pad(n: int) -> int:
+    return (8 - n % 8) % 8
+
+
+def write_snapshot(path: str, root: str, version: int, store: DocumentStore, sync: Optional[Dict] = None):
+    """Write the store to a versioned binary file, atomically replacing any previous snapshot
+
+    Layout: magic, format, header length, JSON header (names, dirs, column sizes,
+    delta-sync state), then each column array and the text buffer, 8-byte aligned.
+    """
+    header = {
+        'root': root,
+        'version': version,
+        'created': time.time(),
+        'byteorder': sys.byteorder,
+        'dirs': store.dirs,
+        'names': store.names,
+        'columns': [[name, getattr(store, name).typecode, len(getattr(store, name))]
+                    for name in SNAPSHOT_COLUMNS],
+        'text_bytes': len(store.buffer),
+        'sync': sync
+    }
+    header_bytes = json.dumps(header).encode('utf-8')
+
+    directory = os.path.dirname(path) or '.'
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(prefix='.index-', dir=directory)
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(SNAPSHOT_MAGIC)
+            f.write(struct.pack('<II', SNAPSHOT_FORMAT, len(header_bytes)))
+            f.write(header_bytes)
+            f.write(b'\0' * _pad(len(SNAPSHOT_MAGIC) + 8 + len(header_bytes)))
+            for name in SNAPSHOT_COLUMNS:
+                data = getattr(store, name).tobytes()
+                f.write(data)
+                f.write(b'\0' * _pad(len(data)))
+            f.write(store.buffer)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+def read_snapshot(path: str, root: str):
+    """Map a snapshot back into a DocumentStore
+
+    Returns (version, store, sync) or None if unusable; sync is the delta-sync
+    state passed to write_snapshot, or None.
+    """
+    try:
+        with open(path, 'rb') as f:
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    except (OSError, ValueError):
+        return None
+
+    try:
+        offset = len(SNAPSHOT_MAGIC)
+        if mapped[:offset] != SNAPSHOT_MAGIC:
+            return None
+        fmt, header_length = struct.unpack_from('<II', mapped, offset)
+        if fmt != SNAPSHOT_FORMAT:
+            return None
+        offset += 8
+        header = json.loads(mapped[offset:offset + header_length].decode('utf-8'))
+        if header['root'] != root or header['byteorder'] != sys.byteorder:
+            return None
+        offset += header_length
+        offset += _pad(offset)
+
+        store = DocumentStore()
+        store.dirs = [sys.intern(d) for d in header['dirs']]
+        store._dir_ids = {d: i for i, d in enumerate(store.dirs)}
+        store.names = [sys.intern(n) for n in header['names']]
+        for name, typecode, length in header['columns']:
+            column = array(typecode)
+            nbytes = length * column.itemsize
+            column.frombytes(mapped[offset:offset + nbytes])
+            setattr(store, name, column)
+            offset += nbytes + _pad(nbytes)
+
+        text_bytes = header['text_bytes']
+        if offset + text_bytes > len(mapped):
+            return None
+        # Document text stays in the page cache, addressed through the mapping
+        store.buffer = memoryview(mapped)[offset:offset + text_bytes]
+        return header['version'], store, header.get('sync')
+    except (KeyError, ValueError, struct.error):
+        return None
+
+
+class IndexManager:
+    """Double-buffered corpus index: one generation serves while the next one builds"""
+
+    def __init__(self, root: str, snapshot_path: Optional[str] = None):
+        self.root = root
+        self.snapshot_path = snapshot_path
+        self._current: Optional[IndexGeneration] = None
+        self._build_lock = threading.Lock()
+        self._swap_lock = threading.Lock()
+        self._version = 0
+        self._thread = None
+        self.progress = {'phase': 'idle', 'done': 0, 'total': 0}
+        # Change log for delta sync: (version, {path: 'added' | 'changed' | 'deleted'}) per rebuild.
+        # It is kept in the snapshot; the epoch only changes when a process starts without one,
+        # since versions before that are not in the log.
+        self.epoch = os.urandom(4).hex()
+        self._changes: deque = deque(maxlen=CHANGE_LOG_VERSIONS)
+        self._log_floor: Optional[int] = None
+        # Called as listener(generation, changes, previous) after every swap;
+        # changes is None when there is no earlier generation to diff against
+        self.listeners: List[Callable] = []
+
+    @property
+    def version(self) -> int:
+        generation = self._current
+        return generation.version if generation else 0
+
+    @property
+    def ready(self) -> bool:
+        return self._current is not None
+
+    @contextmanager
+    def acquire(self):
+        """Pin the current generation for the duration of a request"""
+        with self._swap_lock:
+            generation = self._current
+            if generation is not None:
+                generation.acquire()
+        try:
+            yield generation
+        finally:
+            if generation is not None:
+                generation.release()
+
+    def load_snapshot(self) -> bool:
+        """Serve the last snapshot immediately; a following rebuild() reconciles it by mtime"""
+        if not self.snapshot_path:
+            return False
+        with self._build_lock:
+            loaded = read_snapshot(self.snapshot_path, self.root)
+            if loaded is None:
+                return False
+            version, documents, sync = loaded
+            self._version = max(self._version, version)
+            with self._swap_lock:
+                self._current = IndexGeneration(version, documents, self.root)
+            if isinstance(sync, dict) and {'epoch', 'floor', 'changes'} <= set(sync):
+                # Clients synced before the restart keep receiving deltas
+                self.epoch = sync['epoch']
+                self._changes.clear()
+                self._changes.extend((entry_version, changes) for entry_version, changes in sync['changes'])
+                self._log_floor = sync['floor']
+            else:
+                self._log_floor = version
+            return True
+
+    def rebuild(self) -> bool:
+        """Build a new generation off to the side and swap it in if the corpus changed"""
+        with self._build_lock:
+            previous = self._current
+            previous_paths = previous.by_path if previous else {}
+
+            self.progress = {'phase': 'discovering', 'done': 0, 'total': 0}
+            paths = discover_markdown_files(self.root)
+            self.progress = {'phase': 'indexing', 'done': 0, 'total': len(paths)}
+
+            entries = []
+            changed = previous is None
+            changes = {}
+            for path in paths:
+                self.progress['done'] += 1
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+
+                name = os.path.basename(path)
+                old = previous.get(path) if previous else None
+                if old and old.mtime == stat.st_mtime and old.size == stat.st_size:
+                    entries.append((name.lower(), path, old.mtime, old.size, old.type, old.raw))
+                    continue
+
+                changed = True
+                changes[path] = 'changed' if path in previous_paths else 'added'
+                try:
+                    with open(path, 'r', encoding='utf-8') as f:
+                        raw = f.read().encode('utf-8')
+                except Exception:
+                    raw = b""  # Empty content if file can't be read
+
+                entries.append((name.lower(), path, stat.st_mtime, stat.st_size,
+                                classify_document(name), raw))
+
+            if len(entries) != len(previous_paths):
+                changed = True
+            seen = {entry[1] for entry in entries}
+            changes.update((path, 'deleted') for path in previous_paths if path not in seen)
+            if not changed:
+                self.progress['phase'] = 'idle'
+                return False
+
+            entries.sort(key=lambda entry: entry[0])
+            documents = DocumentStore()
+            for _, path, mtime, size, doc_type, raw in entries:
+                documents.append(path, mtime, size, doc_type, raw)
+            del entries
+
+            self._version += 1
+            generation = IndexGeneration(self._version, documents, self.root)
+
+            # Logged before the swap so any request pinned to this generation finds its entry
+            self._log_changes(generation.version, changes if previous is not None else None)
+            with self._swap_lock:
+                self._current = generation
+            for listener in self.listeners:
+                try:
+                    listener(generation, changes if previous is not None else None, previous)
+                except Exception as e:
+                    print(f"⚠️  Index listener failed: {e}")
+            if previous is not None:
+                previous.retire()
+
+            if self.snapshot_path:
+                self.progress['phase'] = 'snapshotting'
+                try:
+                    write_snapshot(self.snapshot_path, self.root, generation.version, documents, {
+                        'epoch': self.epoch,
+                        'floor': self._log_floor,
+                        'changes': list(self._changes)
+                    })
+                except OSError as e:
+                    print(f"⚠️  Index snapshot not written: {e}")
+            self.progress['phase'] = 'idle'
+            return True
+
+    def _log_changes(self, version: int, changes: Optional[Dict[str, str]]):
+        if changes is None or self._log_floor is None:
+            # First generation of this process: nothing earlier to diff against
+            self._changes.clear()
+            self._log_floor = version
+            return
+        if len(self._changes) == self._changes.maxlen:
+            self._log_floor = self._changes[0][0]
+        self._changes.append((version, changes))
+
+    def changes_since(self, since: int, until: int) -> Optional[Dict[str, str]]:
+        """Paths added, changed or deleted in versions (since, until], or None if the log cannot answer"""
+        floor = self._log_floor
+        if floor is None or since < floor or since > until:
+            return None
+        merged = {}
+        for version, changes in list(self._changes):
+            if since < version <= until:
+                for path, kind in changes.items():
+                    # Still new to a client that last synced before it was added
+                    if kind == 'changed' and merged.get(path) == 'added':
+                        continue
+                    merged[path] = kind
+        return merged
+
+    def start_background(self, interval: int = REINDEX_INTERVAL):
+        """Periodically rebuild in a daemon thread while the current generation serves"""
+        def loop():
+            while True:
+                time.sleep(interval)
+                try:
+                    self.rebuild()
+                except Exception as e:
+                    print(f"⚠️  Index rebuild failed: {e}")
+
+        self._thread = threading.Thread(target=loop, name='index-rebuild', daemon=True)
+        self._thread.start()
@@ -0,0 +1,370 @@
+"""
+Open-loop load generator for the documentation services.
+Requests are sent on a fixed arrival schedule whether or not earlier ones have
+finished, and latency is measured from when each request was due rather than
+when it was actually sent, so queueing delay behind a slow response is counted
+instead of hidden (coordinated omission). Results are kept in HDR-style
+log-linear histograms; a sweep raises the rate until a service saturates.
+
+    python docs_load.py run --service docs --mix reading --rate 200 --duration 30
+    python docs_load.py sweep --service all --slo-ms 250
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import random
+import sys
+import time
+import urllib.parse
+import urllib.request
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
+
+SERVICES = {
+    'docs': 'http://localhost:44500',
+    'silver': 'http://localhost:45503',
+    'randomness': 'http://localhost:47777',
+    'shrine': 'http://localhost:44777',
+}
+# Weighted (weight, method, path) per named mix; {doc} and {query} are filled per request
+MIXES = {
+    'docs': {
+        'reading': [(60, 'GET', '/doc/{doc}'), (15, 'GET', '/api/doc/{doc}/sections'),
+                    (10, 'GET', '/doc/{doc}/raw'), (10, 'GET', '/'), (5, 'GET', '/api/search?q={query}')],
+        'search': [(55, 'GET', '/api/search?q={query}'), (20, 'GET', '/api/search/stream?q={query}'),
+                   (15, 'GET', '/doc/{doc}'), (10, 'GET', '/api/files')],
+        'browse': [(40, 'GET', '/'), (30, 'GET', '/api/files'), (20, 'GET', '/api/content-analysis'),
+                   (10, 'GET', '/api/index-stats')],
+    },
+    'silver': {
+        'static': [(50, 'GET', '/'), (50, 'GET', '/js/compiled/main.js')],
+    },
+    'randomness': {
+        'mixed': [(40, 'GET', '/entropy/jitter'), (20, 'GET', '/entropy/mixed'),
+                  (20, 'GET', '/entropy/clustering-weights'), (10, 'GET', '/entropy/quality'),
+                  (10, 'GET', '/health')],
+    },
+    'shrine': {
+        'visit': [(40, 'GET', '/'), (30, 'GET', '/api/wisdom'), (20, 'GET', '/api/status'),
+                  (10, 'GET', '/health')],
+    },
+}
+DEFAULT_QUERIES = ('python', 'design', 'system', 'notes', 'performance', 'async', 'memory', 'zzyzxnomatch')
+REPORT_PERCENTILES = (50, 90, 99, 99.9, 99.99)
+MAX_DISPATCH_LAG = 0.010  # Seconds behind schedule before the generator itself is the bottleneck
+
+
+class LatencyHistogram:
+    """Log-linear histogram of microsecond values with a fixed number of significant digits"""
+
+    def __init__(self, digits: int = 3):
+        self.digits = digits
+        self.sub_bits = math.ceil(math.log2(2 * 10 ** digits))
+        self.sub_count = 1 << self.sub_bits
+        self.half = self.sub_count // 2
+        self.counts: Counter = Counter()
+        self.total = 0
+        self.max = 0
+
+    def _index(self, value: int) -> int:
+        if value < self.sub_count:
+            return value
+        shift = value.bit_length() - self.sub_bits
+        return self.sub_count + (shift - 1) * self.half + (value >> shift) - self.half
+
+    def _highest(self, index: int) -> int:
+        """Largest value that lands in bucket `index`"""
+        if index < self.sub_count:
+            return index
+        shift, offset = divmod(index - self.sub_count, self.half)
+        shift += 1
+        return ((offset + self.half) << shift) + (1 << shift) - 1
+
+    def record(self, seconds: float):
+        value = max(0, int(seconds * 1_000_000))
+        self.counts[self._index(value)] += 1
+        self.total += 1
+        self.max = max(self.max, value)
+
+    def merge(self, other: 'LatencyHistogram'):
+        self.counts.update(other.counts)
+        self.total += other.total
+        self.max = max(self.max, other.max)
+
+    def percentile(self, p: float) -> Optional[float]:
+        """Value in ms at or below which p percent of recorded values fall"""
+        if not self.total:
+            return None
+        target = max(1, math.ceil(p / 100 * self.total))
+        seen = 0
+        for index in sorted(self.counts):
+            seen += self.counts[index]
+            if seen >= target:
+                return min(self._highest(index), self.max) / 1000
+        return self.max / 1000
+
+    def summary(self) -> Dict:
+        summary = {f'p{p:g}_ms': self.percentile(p) for p in REPORT_PERCENTILES}
+        summary['max_ms'] = self.max / 1000 if self.total else None
+        summary['count'] = self.total
+        # Bucket upper bounds in µs -> counts, enough to merge or re-plot runs later
+        summary['buckets_us'] = {str(self._highest(index)): count for index, count in sorted(self.counts.items())}
+        return summary
+
+
+class RequestMix:
+    """Picks weighted requests for one service, filling in documents and queries"""
+
+    def __init__(self, entries: List[Tuple[int, str, str]], documents: List[str], queries: List[str]):
+        self.entries = entries
+        self.cum_weights = []
+        total = 0
+        for weight, _, _ in entries:
+            total += weight
+            self.cum_weights.append(total)
+        self.documents = documents
+        self.queries = queries
+
+    def pick(self, rng: random.Random) -> Tuple[str, str]:
+        _, method, path = rng.choices(self.entries, cum_weights=self.cum_weights)[0]
+        if '{doc}' in path:
+            path = path.replace('{doc}', rng.choice(self.documents))
+        if '{query}' in path:
+            path = path.replace('{query}', urllib.parse.quote(rng.choice(self.queries)))
+        return method, path
+
+
+def document_ids(base_url: str, limit: int = 2000) -> List[str]:
+    """Document ids to read, from the docs server's own listing"""
+    with urllib.request.urlopen(f'{base_url}/api/files', timeout=30) as response:
+        files = json.load(response)
+    return [entry['id'] for entry in files[:limit]]
+
+
+class Target:
+    """host:port of a service plus the raw request bytes for each (method, path)"""
+
+    def __init__(self, base_url: str):
+        parsed = urllib.parse.urlparse(base_url)
+        if parsed.scheme != 'http':
+            raise ValueError("Only plain http targets are supported; point at the backend, not nginx")
+        self.host = parsed.hostname
+        self.port = parsed.port or 80
+        self.prefix = parsed.path.rstrip('/')
+
+    def request_bytes(self, method: str, path: str) -> bytes:
+        return (f'{method} {self.prefix}{path} HTTP/1.1\r\nHost: {self.host}:{self.port}\r\n'
+                f'Connection: close\r\nContent-Length: 0\r\n\r\n').encode()
+
+    async def fetch(self, method: str, path: str) -> int:
+        """Send one request on a fresh connection and read the response to EOF; returns the status"""
+        reader, writer = await asyncio.open_connection(self.host, self.port)
+        try:
+            writer.write(self.request_bytes(method, path))
+            await writer.drain()
+            status_line = await reader.readline()
+            while await reader.read(65536):
+                pass
+            return int(status_line.split()[1])
+        finally:
+            writer.close()
+
+
+async def drive(target: Target, mix: RequestMix, rate: float, duration: float, connections: int = 100,
+                timeout: float = 10, warmup: float = 2, arrival: str = 'constant', seed: int = 1) -> Dict:
+    """Offer `rate` requests per second for warmup + duration seconds and measure the last `duration`"""
+    loop = asyncio.get_running_loop()
+    rng = random.Random(seed)
+    semaphore = asyncio.Semaphore(connections)
+    corrected = LatencyHistogram()
+    uncorrected = LatencyHistogram()
+    statuses: Counter = Counter()
+    stats = {'ok': 0, 'errors': 0, 'timeouts': 0, 'unfinished': 0, 'completed_in_window': 0, 'max_lag': 0.0,
+             'late': 0}
+
+    start = loop.time() + 0.05
+    measure_from = start + warmup
+    end = measure_from + duration
+
+    async def one(intended: float, method: str, path: str):
+        async with semaphore:
+            sent = loop.time()
+            timed_out = False
+            try:
+                status = await asyncio.wait_for(target.fetch(method, path), timeout)
+            except asyncio.TimeoutError:
+                status, timed_out = 0, True
+            except (OSError, ValueError, IndexError):
+                status = 0
+            done = loop.time()
+        if intended < measure_from:
+            return
+        statuses[status] += 1
+        if 200 <= status < 400:
+            stats['ok'] += 1
+            corrected.record(done - intended)
+            uncorrected.record(done - sent)
+            if done <= end:
+                stats['completed_in_window'] += 1
+        else:
+            stats['errors'] += 1
+            if timed_out:
+                # Abandoned, not answered: its latency is at least this, and leaving it out
+                # would hide exactly the slowest requests
+                stats['timeouts'] += 1
+                corrected.record(done - intended)
+
+    pending: Dict[asyncio.Task, float] = {}
+    intended = start
+    while intended < end:
+        delay = intended - loop.time()
+        await asyncio.sleep(max(0.0, delay))
+        lag = loop.time() - intended
+        if lag > MAX_DISPATCH_LAG and intended >= measure_from:
+            stats['late'] += 1
+        stats['max_lag'] = max(stats['max_lag'], lag)
+        task = loop.create_task(one(intended, *mix.pick(rng)))
+        pending[task] = intended
+        task.add_done_callback(lambda done: pending.pop(done, None))
+        intended += rng.expovariate(rate) if arrival == 'poisson' else 1 / rate
+
+    if pending:
+        await asyncio.wait(list(pending), timeout=timeout + 1)
+    # Still queued for a connection or in flight at the deadline: count them as timed out
+    # from their intended start, or the corrected histogram would omit the worst requests
+    deadline = loop.time()
+    for task, task_intended in list(pending.items()):
+        task.cancel()
+        if task_intended >= measure_from:
+            stats['unfinished'] += 1
+            stats['errors'] += 1
+            statuses[0] += 1
+            corrected.record(deadline - task_intended)
+
+    offered = stats['ok'] + stats['errors']
+    return {
+        'offered_rps': rate,
+        'achieved_rps': round(stats['completed_in_window'] / duration, 2),
+        'requests': offered,
+        'errors': stats['errors'],
+        'timeouts': stats['timeouts'],
+        'unfinished': stats['unfinished'],
+        'error_rate': round(stats['errors'] / offered, 4) if offered else 0.0,
+        'statuses': {str(status): count for status, count in sorted(statuses.items())},
+        'max_dispatch_lag_ms': round(stats['max_lag'] * 1000, 2),
+        'late_dispatches': stats['late'],
+        'corrected': corrected.summary(),
+        'uncorrected': uncorrected.summary()
+    }
+
+
+def saturated(result: Dict, slo_ms: float, max_error_rate: float) -> Optional[str]:
+    """Why a step counts as past the saturation point, or None if the service kept up"""
+    if result['achieved_rps'] < 0.95 * result['offered_rps']:
+        return 'throughput fell behind the offered rate'
+    if result['error_rate'] > max_error_rate:
+        return f"error rate {result['error_rate']:.1%}"
+    p99 = result['corrected']['p99_ms']
+    if p99 is None or p99 > slo_ms:
+        return f"corrected p99 {p99} ms over the {slo_ms:g} ms objective"
+    return None
+
+
+def print_result(service: str, mix: str, result: Dict):
+    print(f"{service}/{mix} @ {result['offered_rps']:g} req/s offered, {result['achieved_rps']:g} achieved, "
+          f"{result['requests']} requests, {result['errors']} errors")
+    if result['timeouts'] or result['unfinished']:
+        print(f"  {result['timeouts']} timed out and {result['unfinished']} never finished; both count as errors "
+              f"and enter the corrected histogram at the time they were abandoned")
+    print(f"  {'':12}" + ''.join(f"{f'p{p:g}':>10}" for p in REPORT_PERCENTILES) + f"{'max':>10}")
+    for name in ('corrected', 'uncorrected'):
+        summary = result[name]
+        cells = [summary[f'p{p:g}_ms'] for p in REPORT_PERCENTILES] + [summary['max_ms']]
+        print(f"  {name:12}" + ''.join(f"{'-' if cell is None else f'{cell:.2f}':>10}" for cell in cells))
+    if result['late_dispatches']:
+        print(f"  warning: {result['late_dispatches']} requests left the generator over "
+              f"{MAX_DISPATCH_LAG * 1000:g} ms late (max {result['max_dispatch_lag_ms']} ms); "
+              f"the client, not the service, may be the limit")
+
+
+def resolve(args, service: str) -> Tuple[Target, str, RequestMix]:
+    base_url = args.url if args.url and args.service != 'all' else SERVICES[service]
+    mixes = MIXES[service]
+    mix_name = args.mix if args.mix in mixes else next(iter(mixes))
+    entries = mixes[mix_name]
+    documents = []
+    if any('{doc}' in path for _, _, path in entries):
+        documents = document_ids(base_url)
+        if not documents:
+            raise SystemExit(f"{base_url} lists no documents to read")
+    return Target(base_url), mix_name, RequestMix(entries, documents, args.query or list(DEFAULT_QUERIES))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Open-loop load generator for the documentation services")
+    commands = parser.add_subparsers(dest='command', required=True)
+    for name, help_text in (('run', "Offer one fixed rate"), ('sweep', "Raise the rate until saturation")):
+        command = commands.add_parser(name, help=help_text)
+        command.add_argument('--service', choices=sorted(SERVICES) + (['all'] if name == 'sweep' else []),
+                             default='docs')
+        command.add_argument('--url', help="Base URL overriding the service's default")
+        command.add_argument('--mix', help="Endpoint mix (default: the service's first)")
+        command.add_argument('--query', action='append', help="Search terms for {query} (repeatable)")
+        command.add_argument('--duration', type=float, default=30 if name == 'run' else 15,
+                             help="Measured seconds per rate")
+        command.add_argument('--warmup', type=float, default=2, help="Unmeasured seconds before each rate")
+        command.add_argument('--connections', type=int, default=100, help="Most requests in flight at once")
+        command.add_argument('--timeout', type=float, default=10)
+        command.add_argument('--arrival', choices=('constant', 'poisson'), default='constant')
+        command.add_argument('--seed', type=int, default=1)
+        command.add_argument('--output', help="Write results as JSON")
+    commands.choices['run'].add_argument('--rate', type=float, required=True, help="Requests per second")
+    sweep = commands.choices['sweep']
+    sweep.add_argument('--start-rate', type=float, default=10)
+    sweep.add_argument('--max-rate', type=float, default=5000)
+    sweep.add_argument('--factor', type=float, default=1.5, help="Rate multiplier between steps")
+    sweep.add_argument('--slo-ms', type=float, default=500, help="Corrected p99 above this counts as saturated")
+    sweep.add_argument('--max-error-rate', type=float, default=0.01)
+    args = parser.parse_args()
+
+    options = dict(connections=args.connections, timeout=args.timeout, warmup=args.warmup,
+                   arrival=args.arrival, seed=args.seed)
+    results = {'started_at': time.strftime('%Y-%m-%dT%H:%M:%S%z'), 'settings': vars(args), 'services': {}}
+
+    services = sorted(SERVICES) if args.service == 'all' else [args.service]
+    for service in services:
+        target, mix_name, mix = resolve(args, service)
+        if args.command == 'run':
+            result = asyncio.run(drive(target, mix, args.rate, args.duration, **options))
+            print_result(service, mix_name, result)
+            results['services'][service] = {'mix': mix_name, 'runs': [result]}
+            continue
+
+        steps, sustained, reason = [], None, None
+        rate = args.start_rate
+        while rate <= args.max_rate:
+            result = asyncio.run(drive(target, mix, rate, args.duration, **options))
+            print_result(service, mix_name, result)
+            steps.append(result)
+            reason = saturated(result, args.slo_ms, args.max_error_rate)
+            if reason:
+                break
+            sustained = rate
+            rate = round(rate * args.factor, 2)
+        if reason:
+            print(f"==> {service}/{mix_name} saturates above {sustained or 0:g} req/s ({reason} at {rate:g})\n")
+        else:
+            print(f"==> {service}/{mix_name} kept up to the {args.max_rate:g} req/s ceiling\n")
+        results['services'][service] = {'mix': mix_name, 'runs': steps, 'saturation_rps': sustained,
+                                        'saturation_reason': reason}
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"Results written to {args.output}", file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,112 @@
+"""
+Memory introspection for the enhanced documentation server.
+Wraps tracemalloc snapshots against a baseline and sizes the named caches,
+so memory budgets can be set from measurements.
+"""
+
+import sys
+import threading
+import tracemalloc
+from typing import Dict, Optional
+
+TRACE_FRAMES = 10  # Frames kept per allocation; more frames cost more memory while tracing
+SNAPSHOT_FILTERS = (
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, '<frozen importlib._bootstrap>'),
+    tracemalloc.Filter(False, '<frozen importlib._bootstrap_external>'),
+    tracemalloc.Filter(False, '<unknown>'),
+)
+
+
+def deep_sizeof(obj, seen: Optional[set] = None) -> int:
+    """Approximate retained size of plain containers, strings and bytes"""
+    if seen is None:
+        seen = set()
+    if id(obj) in seen:
+        return 0
+    seen.add(id(obj))
+    size = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        size += sum(deep_sizeof(k, seen) + deep_sizeof(v, seen) for k, v in obj.items())
+    elif isinstance(obj, (list, tuple, set, frozenset)):
+        size += sum(deep_sizeof(item, seen) for item in obj)
+    return size
+
+
+def cache_report(caches: Dict) -> Dict[str, Dict[str, int]]:
+    """Entries and approximate bytes held by each named cache"""
+    report = {}
+    for name, cache in caches.items():
+        entries = cache.entries()
+        report[name] = {'entries': len(entries), 'bytes': deep_sizeof(entries)}
+    return report
+
+
+class MemoryTracer:
+    """tracemalloc switched on at runtime, with a baseline snapshot to diff against"""
+
+    def __init__(self):
+        self.baseline: Optional[tracemalloc.Snapshot] = None
+        self._lock = threading.Lock()
+
+    def start(self, frames: int = TRACE_FRAMES):
+        with self._lock:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start(frames)
+            self.baseline = self._snapshot()
+
+    def take_baseline(self):
+        with self._lock:
+            if not tracemalloc.is_tracing():
+                raise ValueError("Tracing is not running")
+            self.baseline = self._snapshot()
+
+    def stop(self):
+        with self._lock:
+            tracemalloc.stop()
+            self.baseline = None
+
+    @staticmethod
+    def _snapshot() -> tracemalloc.Snapshot:
+        return tracemalloc.take_snapshot().filter_traces(SNAPSHOT_FILTERS)
+
+    def report(self, limit: int = 25, group_by: str = 'lineno') -> Dict:
+        """Top allocation sites, as growth since the baseline when there is one"""
+        if group_by not in ('lineno', 'filename', 'traceback'):
+            raise ValueError("group_by must be lineno, filename or traceback")
+        if not tracemalloc.is_tracing():
+            return {'tracing': False}
+
+        current, peak = tracemalloc.get_traced_memory()
+        report = {
+            'tracing': True,
+            'traced_bytes': current,
+            'peak_traced_bytes': peak,
+            'tracemalloc_overhead_bytes': tracemalloc.get_tracemalloc_memory()
+        }
+        with self._lock:
+            snapshot = self._snapshot()
+            baseline = self.baseline
+
+        def site(stat):
+            return stat.traceback.format() if group_by == 'traceback' else str(stat.traceback[-1])
+
+        if baseline is not None:
+            stats = snapshot.compare_to(baseline, group_by)[:limit]
+            report['top'] = [{
+                'site': site(stat),
+                'size_bytes': stat.size,
+                'size_diff_bytes': stat.size_diff,
+                'count': stat.count,
+                'count_diff': stat.count_diff
+            } for stat in stats]
+        else:
+            report['top'] = [{
+                'site': site(stat),
+                'size_bytes': stat.size,
+                'count': stat.count
+            } for stat in snapshot.statistics(group_by)[:limit]]
+        return report
+
+
+tracer = MemoryTracer()
@@ -0,0 +1,154 @@
+"""
+Prometheus text-format metrics for the enhanced documentation server.
+Collectors keep plain Python numbers behind one short per-metric lock, so
+recording a request costs a few dict lookups and additions.
+"""
+
+import bisect
+import threading
+import time
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216)
+
+
+def _format_labels(names: Tuple[str, ...], values: Tuple) -> str:
+    if not names:
+        return ''
+    pairs = ','.join(f'{name}="{str(value)}"' for name, value in zip(names, values))
+    return '{' + pairs + '}'
+
+
+def _format_value(value: float) -> str:
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    """Monotonic count per label combination, or read from a callback at scrape time"""
+    kind = 'counter'
+
+    def __init__(self, name: str, help_text: str, labels: Tuple[str, ...] = (),
+                 callback: Optional[Callable[[], Dict[Tuple, float]]] = None):
+        self.name = name
+        self.help = help_text
+        self.labels = labels
+        self.callback = callback
+        self._values: Dict[Tuple, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *label_values, amount: float = 1):
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def samples(self) -> Iterable[str]:
+        if self.callback is not None:
+            items = list(self.callback().items())
+        else:
+            with self._lock:
+                items = list(self._values.items())
+        for values, value in sorted(items):
+            yield f'{self.name}{_format_labels(self.labels, values)} {_format_value(value)}'
+
+
+class Gauge(Counter):
+    """Value that goes up and down"""
+    kind = 'gauge'
+
+    def dec(self, *label_values, amount: float = 1):
+        self.inc(*label_values, amount=-amount)
+
+
+class Histogram:
+    """Cumulative-bucket histogram per label combination"""
+    kind = 'histogram'
+
+    def __init__(self, name: str, help_text: str, labels: Tuple[str, ...] = (),
+                 buckets: Tuple[float, ...] = LATENCY_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.labels = labels
+        self.buckets = buckets
+        # label values -> [per-bucket counts..., +Inf count, sum]
+        self._values: Dict[Tuple, List[float]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *label_values):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            row = self._values.get(label_values)
+            if row is None:
+                row = self._values[label_values] = [0] * (len(self.buckets) + 2)
+            row[index] += 1
+            row[-1] += value
+
+    def samples(self) -> Iterable[str]:
+        with self._lock:
+            items = [(values, list(row)) for values, row in self._values.items()]
+        names = self.labels + ('le',)
+        for values, row in sorted(items):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float('inf'),), row):
+                cumulative += count
+                le = '+Inf' if bound == float('inf') else _format_value(bound)
+                yield f'{self.name}_bucket{_format_labels(names, values + (le,))} {cumulative}'
+            labels = _format_labels(self.labels, values)
+            yield f'{self.name}_sum{labels} {_format_value(row[-1])}'
+            yield f'{self.name}_count{labels} {cumulative}'
+
+
+class CountingWriter:
+    """Wraps a handler's wfile to count the bytes and time spent writing the current response"""
+    __slots__ = ('raw', 'bytes', 'seconds')
+
+    def __init__(self, raw):
+        self.raw = raw
+        self.bytes = 0
+        self.seconds = 0.0
+
+    def write(self, data) -> int:
+        started = time.perf_counter()
+        self.bytes += len(data)
+        try:
+            return self.raw.write(data)
+        finally:
+            self.seconds += time.perf_counter() - started
+
+    def __getattr__(self, name):
+        return getattr(self.raw, name)
+
+
+class Registry:
+    """Ordered set of metrics rendered together in the text exposition format"""
+
+    def __init__(self):
+        self.metrics = []
+
+    def register(self, metric):
+        self.metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        lines = []
+        for metric in self.metrics:
+            lines.append(f'# HELP {metric.name} {metric.help}')
+            lines.append(f'# TYPE {metric.name} {metric.kind}')
+            lines.extend(metric.samples())
+        return '\n'.join(lines) + '\n'
+
+
+registry = Registry()
+
+requests_total = registry.register(Counter(
+    'docs_http_requests_total', 'HTTP requests answered', ('route', 'method', 'status')))
+request_duration = registry.register(Histogram(
+    'docs_http_request_duration_seconds', 'Time spent answering a request', ('route',)))
+response_size = registry.register(Histogram(
+    'docs_http_response_size_bytes', 'Bytes written per response, headers included', ('route',),
+    buckets=SIZE_BUCKETS))
+in_flight = registry.register(Gauge(
+    'docs_http_requests_in_flight', 'Requests currently being answered', ('route',)))
+subprocess_runs = registry.register(Counter(
+    'docs_subprocess_runs_total', 'External commands started', ('command',)))
+subprocess_timeouts = registry.register(Counter(
+    'docs_subprocess_timeouts_total', 'External commands killed at their deadline', ('command',)))
@@ -0,0 +1,142 @@
+"""
+On-demand request profiling for the enhanced documentation server.
+Profiles a sampled fraction of requests, or every request for a time window,
+with cProfile plus a stack sampler, aggregated per route. Switched on and off
+at runtime through the admin endpoints; costs one random() call per request
+while off.
+"""
+
+import cProfile
+import io
+import marshal
+import pstats
+import random
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from typing import Dict, Optional
+
+SAMPLE_INTERVAL = 0.005  # Seconds between stack samples of profiled requests
+MAX_STACK_DEPTH = 64
+
+
+class RequestProfiler:
+    """Per-route cProfile stats and collapsed stacks for selected requests"""
+
+    def __init__(self):
+        self.rate = 0.0
+        self.until = 0.0
+        self.profiled = 0
+        self._stats: Dict[str, pstats.Stats] = {}
+        self._stacks: Counter = Counter()
+        self._active: Dict[int, str] = {}  # thread id -> route being profiled
+        self._lock = threading.Lock()
+        self._sampler = None
+
+    @property
+    def enabled(self) -> bool:
+        return self.rate > 0 or time.time() < self.until
+
+    def configure(self, mode: str, rate: float = 0.0, seconds: float = 0.0, reset: bool = False):
+        """Switch to 'off', 'sample' (a fraction of requests) or 'window' (all requests for a while)"""
+        if mode not in ('off', 'sample', 'window'):
+            raise ValueError(f"Unknown profiling mode: {mode}")
+        if mode == 'sample' and not 0 < rate <= 1:
+            raise ValueError("Sampling rate must be in (0, 1]")
+        if mode == 'window' and not 0 < seconds <= 3600:
+            raise ValueError("Window must be between 0 and 3600 seconds")
+
+        with self._lock:
+            if reset:
+                self._stats.clear()
+                self._stacks.clear()
+                self.profiled = 0
+            self.rate = rate if mode == 'sample' else 0.0
+            self.until = time.time() + seconds if mode == 'window' else 0.0
+            if mode != 'off' and (self._sampler is None or not self._sampler.is_alive()):
+                self._sampler = threading.Thread(target=self._sample_loop, name='profiler-sampler', daemon=True)
+                self._sampler.start()
+
+    def status(self) -> Dict:
+        with self._lock:
+            return {
+                'enabled': self.enabled,
+                'rate': self.rate,
+                'window_remaining': max(0.0, round(self.until - time.time(), 1)),
+                'profiled_requests': self.profiled,
+                'routes': {route: stats.total_calls for route, stats in self._stats.items()},
+                'stack_samples': sum(self._stacks.values())
+            }
+
+    @contextmanager
+    def profile(self, route: str, enabled: bool = True):
+        """Profile the enclosed request if it is selected; a no-op otherwise"""
+        if not enabled or (not (self.rate and random.random() < self.rate) and time.time() >= self.until):
+            yield
+            return
+
+        profile = cProfile.Profile()
+        try:
+            profile.enable()
+        except ValueError:
+            # Another profiler is active on this thread
+            yield
+            return
+
+        thread_id = threading.get_ident()
+        self._active[thread_id] = route
+        try:
+            yield
+        finally:
+            profile.disable()
+            self._active.pop(thread_id, None)
+            with self._lock:
+                self.profiled += 1
+                if route in self._stats:
+                    self._stats[route].add(profile)
+                else:
+                    self._stats[route] = pstats.Stats(profile)
+
+    def _sample_loop(self):
+        while self.enabled or self._active:
+            for thread_id, frame in sys._current_frames().items():
+                route = self._active.get(thread_id)
+                if route is None:
+                    continue
+                stack = []
+                while frame is not None and len(stack) < MAX_STACK_DEPTH:
+                    code = frame.f_code
+                    stack.append(f"{code.co_name} ({code.co_filename.rsplit('/', 1)[-1]}:{code.co_firstlineno})")
+                    frame = frame.f_back
+                key = ';'.join([route] + stack[::-1])
+                with self._lock:
+                    self._stacks[key] += 1
+            time.sleep(SAMPLE_INTERVAL)
+
+    def report(self, route: Optional[str] = None, output: str = 'text', sort: str = 'cumulative',
+               limit: int = 50) -> Optional[bytes]:
+        """Aggregated profile as pstats text, a marshalled pstats dump or collapsed stacks"""
+        with self._lock:
+            if output == 'collapsed':
+                lines = [f"{stack} {count}" for stack, count in self._stacks.most_common()
+                         if route is None or stack.split(';', 1)[0] == route]
+                return ('\n'.join(lines) + '\n').encode()
+
+            selected = [stats for name, stats in self._stats.items() if route is None or name == route]
+            if not selected:
+                return None
+            merged = pstats.Stats()
+            merged.add(*selected)
+
+        if output == 'pstats':
+            # Same bytes as Stats.dump_stats(), loadable with pstats.Stats(path)
+            return marshal.dumps(merged.stats)
+        stream = io.StringIO()
+        merged.stream = stream
+        merged.sort_stats(sort).print_stats(limit)
+        return stream.getvalue().encode()
+
+
+profiler = RequestProfiler()
@@ -0,0 +1,876 @@
+"""
+Markdown rendering for the enhanced documentation server.
+Heavy modules (markdown, and Pygments through codehilite) are imported on first use
+so the server can bind its socket before paying for them.
+"""
+
+import hashlib
+import html as html_module
+import multiprocessing
+import os
+import re
+import threading
+import time
+import urllib.parse
+from collections import Counter, OrderedDict
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+import docs_timing as timing
+
+MARKDOWN_EXTENSIONS = ['codehilite', 'fenced_code', 'tables', 'toc']
+
+RENDER_CACHE_BYTES = 256 * 1024 * 1024  # Upper bound on cached HTML fragments
+HIGHLIGHT_CACHE_ENTRIES = 4096  # Highlighted code blocks kept per process
+BLOCK_CACHE_ENTRIES = 16384  # Rendered top-level blocks kept per process
+LEXER_CACHE_ENTRIES = 256
+SECTION_CACHE_ENTRIES = 64  # Sectioned large documents kept per process
+LAZY_SECTION_BYTES = 256 * 1024  # Documents above this size load section by section
+MIN_SECTION_BYTES = 32 * 1024  # Smaller sections are merged with the next, to bound placeholders and fetches
+STREAM_FIRST_BATCH = 8  # Blocks rendered before the first content chunk is sent
+STREAM_MAX_BATCH = 256
+
+_markdown_module = None
+_import_lock = threading.Lock()
+
+
+class LRUCache:
+    """Small thread-safe LRU with hit/miss counters"""
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            value = self._entries.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value):
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def entries(self) -> list:
+        """Copy of the cached items, for memory reports"""
+        with self._lock:
+            return list(self._entries.items())
+
+
+highlight_cache = LRUCache(HIGHLIGHT_CACHE_ENTRIES)
+lexer_cache = LRUCache(LEXER_CACHE_ENTRIES)
+
+
+def _options_key(options: Dict) -> str:
+    return repr(sorted(options.items()))
+
+
+def _install_highlight_cache():
+    """Memoize codehilite output per (lexer, code hash) and reuse Pygments lexers
+
+    fenced_code and codehilite both instantiate codehilite.CodeHilite by name, so
+    swapping in a caching subclass covers indented and fenced blocks alike.
+    """
+    from markdown.extensions import codehilite, fenced_code
+
+    get_lexer_by_name = codehilite.get_lexer_by_name
+
+    def cached_get_lexer_by_name(alias, **options):
+        key = (alias, _options_key(options))
+        lexer = lexer_cache.get(key)
+        if lexer is None:
+            lexer = get_lexer_by_name(alias, **options)
+            lexer_cache.put(key, lexer)
+        return lexer
+
+    base = codehilite.CodeHilite
+
+    class CachedCodeHilite(base):
+        def hilite(self, shebang: bool = True) -> str:
+            digest = hashlib.blake2b(self.src.encode('utf-8'), digest_size=16).digest()
+            key = (self.lang, digest, shebang, self.use_pygments, self.guess_lang,
+                   repr(self.pygments_formatter), _options_key(self.options))
+            html = highlight_cache.get(key)
+            if html is None:
+                html = super().hilite(shebang)
+                highlight_cache.put(key, html)
+            return html
+
+    codehilite.get_lexer_by_name = cached_get_lexer_by_name
+    codehilite.CodeHilite = CachedCodeHilite
+    fenced_code.CodeHilite = CachedCodeHilite
+
+
+def get_markdown():
+    """Import the markdown package on first use"""
+    global _markdown_module
+    if _markdown_module is None:
+        with _import_lock:
+            if _markdown_module is None:
+                import markdown
+                _install_highlight_cache()
+                _markdown_module = markdown
+    return _markdown_module
+
+
+def create_markdown():
+    """Fresh Markdown instance with the extensions every page is rendered with"""
+    return get_markdown().Markdown(extensions=MARKDOWN_EXTENSIONS)
+
+
+def render_markdown(content: str) -> str:
+    """Convert markdown source to an HTML fragment"""
+    return create_markdown().convert(content)
+
+
+block_cache = LRUCache(BLOCK_CACHE_ENTRIES)
+
+FENCE_RE = re.compile(r'^ {0,3}(`{3,}|~{3,})')
+CONTINUATION_RE = re.compile(r'^(\s|>|[*+-]\s|\d+[.)]\s)')
+# Constructs whose meaning spans blocks: reference definitions, [TOC] markers, raw HTML,
+# and inline heading tags, which the heading-id pass could not tell from toc headings
+WHOLE_DOCUMENT_RE = re.compile(r'^ {0,3}(\[[^\]]+\]:\s|\[TOC\]|<[a-zA-Z!/])|<[hH][1-6][\s>/]', re.MULTILINE)
+HEADING_ID_RE = re.compile(r'(<h[1-6] id=")([^"]*)(")')
+BLOCK_BOUNDARY = f"<!--block-boundary-{os.urandom(6).hex()}-->"
+BLOCK_BOUNDARY_RE = re.compile(re.escape(BLOCK_BOUNDARY) + r'\n*')
+
+
+def block_spans(content: str) -> List[Tuple[int, int]]:
+    """Character spans of the top-level blocks of a markdown document
+
+    Blank lines end a block unless the next line continues it (indented text,
+    list items, block quotes); fenced code is never split.
+    """
+    spans = []
+    start = end = None
+    fence = None
+    pending_blank = False
+    position = 0
+
+    for line in content.split('\n'):
+        line_start = position
+        position += len(line) + 1
+
+        if fence:
+            end = line_start + len(line)
+            if line.strip().startswith(fence) and line.strip().strip(fence[0]) == '':
+                fence = None
+            continue
+
+        if not line.strip():
+            if start is not None:
+                pending_blank = True
+            continue
+
+        if pending_blank and not CONTINUATION_RE.match(line):
+            spans.append((start, end))
+            start = None
+        pending_blank = False
+
+        match = FENCE_RE.match(line)
+        if match:
+            fence = match.group(1)
+        if start is None:
+            start = line_start
+        end = line_start + len(line)
+
+    if start is not None:
+        spans.append((start, end))
+    return spans
+
+
+def split_blocks(content: str) -> List[str]:
+    """Split markdown into top-level blocks that render independently"""
+    return [content[start:end] for start, end in block_spans(content)]
+
+
+def _flatten_toc(tokens: List[Dict], out: List[Dict]) -> List[Dict]:
+    for token in tokens:
+        out.append({'level': token['level'], 'id': token['id'], 'name': token['name']})
+        _flatten_toc(token['children'], out)
+    return out
+
+
+def _render_missing(blocks: List[str], keys: List[bytes]) -> Optional[List[Tuple[str, List[Dict]]]]:
+    """Convert uncached blocks in one pass, separated by boundary comments
+
+    Returns (segment, headings) per block and caches each one; None when the
+    boundary markers cannot split the output or heading tags in it do not all
+    come from toc headings.
+
+    Headings are cached with their un-deduplicated slug so ids can be assigned
+    per document at assembly time, exactly as the toc extension would.
+    """
+    from markdown.extensions.toc import slugify
+
+    md = create_markdown()
+    source = ''.join(f"{block}\n\n{BLOCK_BOUNDARY}\n\n" for block in blocks)
+    html = md.convert(source)
+    segments = BLOCK_BOUNDARY_RE.split(html)
+    tokens = _flatten_toc(md.toc_tokens, [])
+    if len(segments) != len(blocks) + 1 or len(HEADING_ID_RE.findall(html)) != len(tokens):
+        return None
+
+    rendered = []
+    position = 0
+    for key, segment in zip(keys, segments):
+        count = len(HEADING_ID_RE.findall(segment))
+        headings = [{
+            'level': token['level'],
+            'name': token['name'],
+            'slug': slugify(html_module.unescape(token['name']), '-')
+        } for token in tokens[position:position + count]]
+        position += count
+        rendered.append((segment, headings))
+        block_cache.put(key, (segment, headings))
+    return rendered
+
+
+def _replace_heading_ids(segment: str, ids: List[str]) -> str:
+    parts = []
+    last = 0
+    for match, heading_id in zip(HEADING_ID_RE.finditer(segment), ids):
+        parts.append(segment[last:match.start(2)])
+        parts.append(heading_id)
+        last = match.end(2)
+    parts.append(segment[last:])
+    return ''.join(parts)
+
+
+def _render_spans(content: str, spans: List[Tuple[int, int]],
+                  used_ids: Optional[set] = None) -> Optional[List[Tuple[str, List[Dict]]]]:
+    """Rendered HTML and headings for each block, with document-wide heading ids
+
+    Pass the same used_ids across calls to render one document in several batches.
+    """
+    get_markdown()
+    from markdown.extensions.toc import unique
+
+    blocks = [content[start:end] for start, end in spans]
+    keys = [hashlib.blake2b(block.encode('utf-8'), digest_size=16).digest() for block in blocks]
+    cached = [block_cache.get(key) for key in keys]
+    missing = [i for i, entry in enumerate(cached) if entry is None]
+    timing.count('blocks_cached', len(blocks) - len(missing))
+    timing.count('blocks_rendered', len(missing))
+    if missing:
+        fresh = _render_missing([blocks[i] for i in missing], [keys[i] for i in missing])
+        if fresh is None:
+            return None
+        # Use the fresh results directly: the bounded cache may already have evicted them
+        for i, entry in zip(missing, fresh):
+            cached[i] = entry
+
+    if used_ids is None:
+        used_ids = set()
+    rendered = []
+    for segment, block_headings in cached:
+        assigned = []
+        if block_headings:
+            assigned = [dict(level=h['level'], name=h['name'], id=unique(h['slug'], used_ids))
+                        for h in block_headings]
+            segment = _replace_heading_ids(segment, [heading['id'] for heading in assigned])
+        rendered.append((segment, assigned))
+    return rendered
+
+
+def _render_whole(content: str) -> Tuple[str, List[Dict]]:
+    md = create_markdown()
+    html = md.convert(content)
+    return html, _flatten_toc(md.toc_tokens, [])
+
+
+def render_blocks(content: str) -> Tuple[str, List[Dict]]:
+    """Render block by block through the block cache; returns (html, headings)
+
+    Only blocks whose text changed are converted again, and the reassembled
+    output matches a whole-document render, heading ids included.
+    """
+    if WHOLE_DOCUMENT_RE.search(content):
+        return _render_whole(content)
+
+    rendered = _render_spans(content, block_spans(content))
+    if rendered is None:
+        return _render_whole(content)
+    headings = [heading for _, block_headings in rendered for heading in block_headings]
+    return ''.join(segment for segment, _ in rendered).strip(), headings
+
+
+def iter_render_blocks(content: str) -> Iterator[str]:
+    """Render in growing batches of blocks, yielding HTML as each batch completes
+
+    The concatenated output equals render_blocks(content)[0].
+    """
+    if WHOLE_DOCUMENT_RE.search(content):
+        yield _render_whole(content)[0]
+        return
+
+    spans = block_spans(content)
+    used_ids = set()
+    pending = ''
+    position = 0
+    batch = STREAM_FIRST_BATCH
+    while position < len(spans):
+        rendered = _render_spans(content, spans[position:position + batch], used_ids)
+        if rendered is None:
+            # Rare: a batch the boundary markers cannot split; finish in one conversion
+            rest = _render_whole(content[spans[position][0]:])[0]
+            pending = (pending + '\n' + rest) if pending else rest
+            break
+        html = ''.join(segment for segment, _ in rendered)
+        if not pending and position == 0:
+            html = html.lstrip()
+        if pending:
+            yield pending
+        pending = html
+        position += batch
+        batch = min(batch * 2, STREAM_MAX_BATCH)
+    yield pending.rstrip()
+
+
+SECTION_HEADING_RE = re.compile(r'^ {0,3}#{1,6}(\s|$)|^[^\n]+\n {0,3}(=+|-+)[ \t]*(\n|$)')
+# Any line that could make a block contain a heading: ATX markers (also inside quotes
+# and list items) or setext underlines. Blocks that do not match have no headings.
+HEADING_CANDIDATE_RE = re.compile(r'^[\s>*+\-\d.)]*#{1,6}(\s|$)|^[\s>]*(=+|-+)[ \t]*$', re.MULTILINE)
+
+
+def section_layout(content: str, min_bytes: int = MIN_SECTION_BYTES) -> List[Dict]:
+    """Split a document at its headings into independently loadable sections, without rendering them
+
+    Each section carries its UTF-8 byte range in the source, its block spans and
+    the toc headings it contains, with the ids a whole-document render assigns.
+    Only blocks that may hold a heading are converted to find those. Adjacent
+    sections are merged until each holds at least min_bytes of source.
+    """
+    spans = block_spans(content)
+    candidates = [i for i, (start, end) in enumerate(spans) if HEADING_CANDIDATE_RE.search(content, start, end)]
+    rendered = None if WHOLE_DOCUMENT_RE.search(content) else _render_spans(content, [spans[i] for i in candidates])
+    if rendered is None:
+        # Cannot be split: one section, rendered whole up front
+        html, headings = _render_whole(content)
+        return [{'start': 0, 'end': len(content.encode('utf-8')), 'spans': spans, 'headings': headings, 'html': html}]
+    block_headings = {i: headings for i, (_, headings) in zip(candidates, rendered)}
+
+    sections = []
+    byte_offset = 0
+    char_offset = 0
+    for i, (start, end) in enumerate(spans):
+        byte_offset += len(content[char_offset:start].encode('utf-8'))
+        block_start = byte_offset
+        byte_offset += len(content[start:end].encode('utf-8'))
+        char_offset = end
+
+        headings = block_headings.get(i, [])
+        if not sections or (headings and SECTION_HEADING_RE.match(content[start:end])
+                            and sections[-1]['end'] - sections[-1]['start'] >= min_bytes):
+            sections.append({'start': block_start, 'end': byte_offset, 'spans': [], 'headings': []})
+        section = sections[-1]
+        section['end'] = byte_offset
+        section['spans'].append((start, end))
+        section['headings'].extend(headings)
+    return sections
+
+
+def render_section(content: str, sections: List[Dict], n: int) -> str:
+    """Rendered HTML of one section from section_layout, heading ids as in the whole document"""
+    section = sections[n]
+    if 'html' in section:
+        return section['html']
+    used_ids = {heading['id'] for earlier in sections[:n] for heading in earlier['headings']}
+    rendered = _render_spans(content, section['spans'], used_ids)
+    if rendered is None:
+        # Rare: blocks the boundary markers cannot split
+        start, end = section['spans'][0][0], section['spans'][-1][1]
+        return _render_whole(content[start:end])[0]
+    return ''.join(segment for segment, _ in rendered).strip()
+
+
+def render_sections(content: str, min_bytes: int = MIN_SECTION_BYTES) -> List[Dict]:
+    """section_layout with every section rendered into its 'html'"""
+    sections = section_layout(content, min_bytes)
+    for n, section in enumerate(sections):
+        section['html'] = render_section(content, sections, n)
+    return sections
+
+
+def render_page(file_path: str, html_content: str) -> str:
+    """Wrap a rendered fragment in the document page served under /file/"""
+    return PAGE_TEMPLATE.format(
+        title=os.path.basename(file_path),
+        file_path=file_path,
+        quoted_path=urllib.parse.quote(file_path),
+        content=html_content
+    )
+
+
+def page_parts(file_path: str) -> Tuple[str, str]:
+    """The document page split around its content, for streaming responses"""
+    marker = f"<!--content-{os.urandom(6).hex()}-->"
+    head, tail = render_page(file_path, marker).split(marker)
+    return head, tail
+
+
+def warm_up():
+    """Import markdown, its extensions and Pygments ahead of the first request"""
+    render_markdown("# warm-up\n\n```python\npass\n```\n\n| a |\n|---|\n| b |\n")
+
+
+class RenderCache:
+    """Bounded LRU of rendered HTML fragments keyed by (path, mtime, size)"""
+
+    def __init__(self, max_bytes: int = RENDER_CACHE_BYTES):
+        self.max_bytes = max_bytes
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[str, Tuple[float, int, str]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, path: str, mtime: float, size: int) -> Optional[str]:
+        with self._lock:
+            entry = self._entries.get(path)
+            if entry is None or entry[0] != mtime or entry[1] != size:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(path)
+            self.hits += 1
+            return entry[2]
+
+    def put(self, path: str, mtime: float, size: int, html: str):
+        with self._lock:
+            old = self._entries.pop(path, None)
+            if old is not None:
+                self.bytes -= len(old[2])
+            self._entries[path] = (mtime, size, html)
+            self.bytes += len(html)
+            while self.bytes > self.max_bytes and len(self._entries) > 1:
+                _, evicted = self._entries.popitem(last=False)
+                self.bytes -= len(evicted[2])
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def entries(self) -> list:
+        """Copy of the cached items, for memory reports"""
+        with self._lock:
+            return list(self._entries.items())
+
+    def __contains__(self, path: str) -> bool:
+        return path in self._entries
+
+
+render_cache = RenderCache()
+
+
+def render_document(path: str) -> str:
+    """Rendered HTML fragment for a markdown file, served from the cache when unchanged"""
+    stat = os.stat(path)
+    html = render_cache.get(path, stat.st_mtime, stat.st_size)
+    timing.note('render_cache', 'miss' if html is None else 'hit')
+    if html is None:
+        with timing.stage('file_io'), open(path, 'r', encoding='utf-8') as f:
+            content = f.read()
+        with timing.stage('markdown'):
+            html, _ = render_blocks(content)
+        render_cache.put(path, stat.st_mtime, stat.st_size, html)
+    return html
+
+
+def stream_document(path: str) -> Iterator[str]:
+    """Rendered HTML for a markdown file in pieces, from the cache when unchanged"""
+    stat = os.stat(path)
+    html = render_cache.get(path, stat.st_mtime, stat.st_size)
+    timing.note('render_cache', 'miss' if html is None else 'hit')
+    if html is not None:
+        yield html
+        return
+
+    with timing.stage('file_io'), open(path, 'r', encoding='utf-8') as f:
+        content = f.read()
+    pieces = []
+    # Only conversion is timed, not the consumer writing each piece out
+    for piece in timing.timed(iter_render_blocks(content), 'markdown'):
+        pieces.append(piece)
+        yield piece
+    render_cache.put(path, stat.st_mtime, stat.st_size, ''.join(pieces))
+
+
+section_cache = LRUCache(SECTION_CACHE_ENTRIES)
+
+
+def document_sections(path: str) -> List[Dict]:
+    """Section layout of a markdown file, cached until the file changes
+
+    Section HTML is rendered on first request by document_section_html and kept
+    in the cached layout.
+    """
+    stat = os.stat(path)
+    key = (path, stat.st_mtime, stat.st_size)
+    sections = section_cache.get(key)
+    timing.note('section_cache', 'miss' if sections is None else 'hit')
+    if sections is None:
+        with timing.stage('file_io'), open(path, 'r', encoding='utf-8') as f:
+            content = f.read()
+        with timing.stage('markdown'):
+            sections = section_layout(content)
+        section_cache.put(key, sections)
+    return sections
+
+
+def document_section_html(path: str, sections: List[Dict], n: int) -> str:
+    """Rendered HTML of section n of a document laid out by document_sections"""
+    section = sections[n]
+    if 'html' not in section:
+        with timing.stage('file_io'), open(path, 'r', encoding='utf-8') as f:
+            content = f.read()
+        with timing.stage('markdown'):
+            section['html'] = render_section(content, sections, n)
+    return section['html']
+
+
+LAZY_SECTIONS_SCRIPT = """<script>
+(function () {
+    var pending = document.querySelectorAll('section.lazy-section');
+    function load(section) {
+        if (section.dataset.loading) return;
+        section.dataset.loading = '1';
+        fetch(section.dataset.src)
+            .then(function (response) { return response.text(); })
+            .then(function (html) {
+                section.innerHTML = html;
+                section.style.minHeight = '';
+                var target = document.getElementById(decodeURIComponent(location.hash.slice(1)));
+                if (target && section.contains(target)) {
+                    target.scrollIntoView();
+                }
+            });
+    }
+    // Links to headings in unloaded sections: find the section in the table of contents
+    function reveal() {
+        var id = decodeURIComponent(location.hash.slice(1));
+        if (!id || document.getElementById(id) || !pending.length) return;
+        fetch(pending[0].dataset.src.replace(/section\\/\\d+$/, 'sections'))
+            .then(function (response) { return response.json(); })
+            .then(function (data) {
+                data.sections.forEach(function (entry) {
+                    var holds = entry.headings.some(function (heading) { return heading.id === id; });
+                    var section = document.querySelector('section.lazy-section[data-index="' + entry.index + '"]');
+                    if (holds && section) {
+                        section.scrollIntoView();
+                        load(section);
+                    }
+                });
+            });
+    }
+    reveal();
+    window.addEventListener('hashchange', reveal);
+    if (!('IntersectionObserver' in window)) {
+        pending.forEach(load);
+        return;
+    }
+    var observer = new IntersectionObserver(function (entries) {
+        entries.forEach(function (entry) {
+            if (entry.isIntersecting) {
+                observer.unobserve(entry.target);
+                load(entry.target);
+            }
+        });
+    }, {rootMargin: '1500px 0px'});
+    pending.forEach(function (section) { observer.observe(section); });
+})();
+</script>"""
+
+
+def lazy_placeholders(doc_id: str, sections: List[Dict]) -> str:
+    """Placeholders for every section after the first, fetched while scrolling"""
+    if len(sections) < 2:
+        return ''
+    parts = ['']
+    for n, section in enumerate(sections[1:], 1):
+        # Reserve roughly the rendered height so the scrollbar stays honest
+        height = max(1, (section['end'] - section['start']) // 60) * 1.7
+        anchors = ''.join(f'<span id="{heading["id"]}"></span>' for heading in section['headings'][:1])
+        parts.append(f'<section class="lazy-section" data-index="{n}" data-src="/api/doc/{doc_id}/section/{n}" '
+                     f'style="min-height: {height:.0f}em">{anchors}</section>')
+    parts.append(LAZY_SECTIONS_SCRIPT)
+    return '\n'.join(parts)
+
+
+def _prerender_worker_init():
+    # Pre-rendering yields the CPU to live requests
+    try:
+        os.nice(10)
+    except OSError:
+        pass
+
+
+def _renders_whole(path: str) -> bool:
+    """Documents above LAZY_SECTION_BYTES are served section by section and never read the render cache"""
+    try:
+        return os.path.getsize(path) <= LAZY_SECTION_BYTES
+    except OSError:
+        return False
+
+
+def _prerender_file(path: str):
+    """Process-pool task: render one file and return it with the stat it was rendered from"""
+    stat = os.stat(path)
+    with open(path, 'r', encoding='utf-8') as f:
+        content = f.read()
+    return path, stat.st_mtime, stat.st_size, render_blocks(content)[0]
+
+
+def popular_documents(log_path: str, limit: int) -> List[str]:
+    """Most requested documents in an nginx access log, as /file/ paths or /doc/ ids"""
+    pattern = re.compile(r'"GET /(?:file/([^ ?"]+)|doc/([0-9a-f]+))[ ?][^"]*" (?:200|301) ')
+    counts = Counter()
+    with open(log_path, 'r', encoding='utf-8', errors='replace') as f:
+        for line in f:
+            match = pattern.search(line)
+            if match:
+                counts[urllib.parse.unquote(match.group(1)) if match.group(1) else match.group(2)] += 1
+    return [key for key, _ in counts.most_common(limit)]
+
+
+def prerender(paths: Iterable[str], workers: Optional[int] = None, rate: float = 0,
+              progress: Optional[Dict] = None) -> Dict:
+    """Render documents across a process pool and fill the render cache
+
+    At most 2 * workers renders are in flight, workers run at lower priority,
+    and a positive rate caps submissions per second so live traffic keeps its share.
+    """
+    paths = [p for p in paths if p.endswith('.md') and p not in render_cache and _renders_whole(p)]
+    workers = workers or max(1, (os.cpu_count() or 2) - 1)
+    progress = progress if progress is not None else {}
+    progress.update({'done': 0, 'failed': 0, 'total': len(paths), 'workers': workers})
+    started = time.time()
+    interval = 1.0 / rate if rate > 0 else 0
+    last_report = started
+
+    # Spawned rather than forked: the server process is already running threads
+    context = multiprocessing.get_context('spawn')
+    with ProcessPoolExecutor(max_workers=workers, mp_context=context,
+                             initializer=_prerender_worker_init) as pool:
+        pending = set()
+        for path in paths:
+            if interval:
+                time.sleep(interval)
+            pending.add(pool.submit(_prerender_file, path))
+            if len(pending) >= workers * 2:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                _collect(done, progress)
+
+            if time.time() - last_report > 5:
+                last_report = time.time()
+                print(f"   🖨️  Pre-rendered {progress['done']}/{progress['total']} documents")
+        done, _ = wait(pending)
+        _collect(done, progress)
+
+    progress['seconds'] = round(time.time() - started, 2)
+    return progress
+
+
+def _collect(futures, progress: Dict):
+    for future in futures:
+        try:
+            path, mtime, size, html = future.result()
+            render_cache.put(path, mtime, size, html)
+            progress['done'] += 1
+        except Exception:
+            progress['failed'] += 1
+
+
+PAGE_TEMPLATE = """<!DOCTYPE html>
+<html lang="en">
+<head>
+    <meta charset="UTF-8">
+    <meta name="viewport" content="width=device-width, initial-scale=1.0">
+    <title>{title}</title>
+    <style>
+        * {{
+            margin: 0;
+            padding: 0;
+            box-sizing: border-box;
+        }}
+        
+        body {{
+            font-family: 'Inter Tight', 'Atkinson Hyperlegible', sans-serif;
+            line-height: 1.7;
+            color: #2d3748;
+            background: #f7fafc;
+            padding: 2rem;
+        }}
+        
+        .container {{
+            max-width: 900px;
+            margin: 0 auto;
+            background: white;
+            border-radius: 12px;
+            box-shadow: 0 4px 6px -1px rgba(0,0,0,0.1);
+            overflow: hidden;
+        }}
+        
+        .header {{
+            background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
+            color: white;
+            padding: 2rem;
+            text-align: center;
+        }}
+        
+        .header h1 {{
+            font-size: 2rem;
+            margin-bottom: 0.5rem;
+        }}
+        
+        .file-path {{
+            font-family: 'JetBrains Mono', 'Fira Code', 'Cascadia Code', monospace;
+            opacity: 0.9;
+            font-size: 0.9rem;
+        }}
+        
+        .nav {{
+            padding: 1rem 2rem;
+            border-bottom: 1px solid #e2e8f0;
+            background: #f7fafc;
+        }}
+        
+        .nav a {{
+            color: #667eea;
+            text-decoration: none;
+            font-weight: 600;
+        }}
+        
+        .nav a:hover {{
+            text-decoration: underline;
+        }}
+        
+        .content {{
+            padding: 3rem;
+            max-width: none;
+        }}
+        
+        .content h1, .content h2, .content h3, .content h4, .content h5, .content h6 {{
+            margin-top: 2rem;
+            margin-bottom: 1rem;
+            color: #1a202c;
+            line-height: 1.3;
+        }}
+        
+        .content h1 {{ font-size: 2.5rem; border-bottom: 2px solid #e2e8f0; padding-bottom: 0.5rem; }}
+        .content h2 {{ font-size: 2rem; }}
+        .content h3 {{ font-size: 1.5rem; }}
+        .content h4 {{ font-size: 1.25rem; }}
+        
+        .content p {{
+            margin-bottom: 1.5rem;
+            text-align: justify;
+        }}
+        
+        .content ul, .content ol {{
+            margin-bottom: 1.5rem;
+            padding-left: 2rem;
+        }}
+        
+        .content li {{
+            margin-bottom: 0.5rem;
+        }}
+        
+        .content code {{
+            background: #edf2f7;
+            padding: 0.2rem 0.4rem;
+            border-radius: 4px;
+            font-family: 'JetBrains Mono', 'Fira Code', 'Cascadia Code', monospace;
+            font-size: 0.9em;
+        }}
+        
+        .content pre {{
+            background: #2d3748;
+            color: #e2e8f0;
+            padding: 1.5rem;
+            border-radius: 8px;
+            overflow-x: auto;
+            margin-bottom: 1.5rem;
+        }}
+        
+        .content pre code {{
+            background: none;
+            padding: 0;
+            color: inherit;
+        }}
+        
+        .content blockquote {{
+            border-left: 4px solid #667eea;
+            padding-left: 1.5rem;
+            margin: 1.5rem 0;
+            font-style: italic;
+            color: #4a5568;
+        }}
+        
+        .content table {{
+            width: 100%;
+            border-collapse: collapse;
+            margin-bottom: 1.5rem;
+        }}
+        
+        .content th, .content td {{
+            border: 1px solid #e2e8f0;
+            padding: 0.75rem;
+            text-align: left;
+        }}
+        
+        .content th {{
+            background: #f7fafc;
+            font-weight: 600;
+        }}
+        
+        .content a {{
+            color: #667eea;
+            text-decoration: none;
+            border-bottom: 1px dotted #667eea;
+        }}
+        
+        .content a:hover {{
+            background: #edf2f7;
+            text-decoration: none;
+            border-bottom: 1px solid #667eea;
+        }}
+        
+        @media (max-width: 768px) {{
+            body {{ padding: 1rem; }}
+            .content {{ padding: 2rem 1.5rem; }}
+            .content h1 {{ font-size: 2rem; }}
+            .content h2 {{ font-size: 1.5rem; }}
+        }}
+    </style>
+</head>
+<body>
+    <div class="container">
+        <div class="header">
+            <h1>📄 {title}</h1>
+            <div class="file-path">{file_path}</div>
+        </div>
+        
+        <div class="nav">
+            <a href="/">← Back to Browser</a>
+            <span style="margin: 0 1rem;">|</span>
+            <a href="/raw/{quoted_path}">View Raw</a>
+        </div>
+        
+        <div class="content">
+            {content}
+        </div>
+    </div>
+</body>
+</html>"""
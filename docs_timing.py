@@ -0,0 +1,117 @@
+"""
+Per-request stage timing and the slow-request log for the enhanced documentation server.
+Stages are accumulated in a thread-local for the request being answered, so the
+render and search code can time itself without handler plumbing; requests over
+the threshold are queued to a writer thread as JSON lines.
+"""
+
+import json
+import os
+import queue
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterable, Iterator, Optional, Tuple
+
+SLOW_LOG_QUEUE = 1000  # Pending slow-log records; beyond this they are dropped, never waited on
+
+_local = threading.local()
+
+
+def begin():
+    """Start collecting stages and notes for the request on this thread"""
+    _local.stages = {}
+    _local.notes = {}
+
+
+def end() -> Tuple[Dict[str, float], Dict]:
+    """Stop collecting and return (stage seconds, notes) for this thread's request"""
+    stages = getattr(_local, 'stages', None) or {}
+    notes = getattr(_local, 'notes', None) or {}
+    _local.stages = None
+    _local.notes = None
+    return stages, notes
+
+
+def add(name: str, seconds: float):
+    stages = getattr(_local, 'stages', None)
+    if stages is not None:
+        stages[name] = stages.get(name, 0.0) + seconds
+
+
+@contextmanager
+def stage(name: str):
+    """Time the enclosed block into the current request's named stage"""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        add(name, time.perf_counter() - started)
+
+
+def timed(iterable: Iterable, name: str) -> Iterator:
+    """Iterate, timing only the producer: work done by the consumer between items is not counted"""
+    iterator = iter(iterable)
+    while True:
+        started = time.perf_counter()
+        try:
+            item = next(iterator)
+        except StopIteration:
+            add(name, time.perf_counter() - started)
+            return
+        add(name, time.perf_counter() - started)
+        yield item
+
+
+def note(key: str, value):
+    """Attach a fact (cache outcome, result count) to the current request's slow-log record"""
+    notes = getattr(_local, 'notes', None)
+    if notes is not None:
+        notes[key] = value
+
+
+def count(key: str, amount: int = 1):
+    notes = getattr(_local, 'notes', None)
+    if notes is not None:
+        notes[key] = notes.get(key, 0) + amount
+
+
+class SlowLog:
+    """Append JSON lines for slow requests from a background thread"""
+
+    def __init__(self, path: str, threshold_ms: float):
+        self.path = path
+        self.threshold = threshold_ms / 1000
+        self.written = 0
+        self.dropped = 0
+        self._queue: queue.Queue = queue.Queue(maxsize=SLOW_LOG_QUEUE)
+        self._thread = threading.Thread(target=self._writer, name='slow-log', daemon=True)
+        self._thread.start()
+
+    def submit(self, record: Dict):
+        try:
+            self._queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+    def _writer(self):
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(self.path, 'a', encoding='utf-8') as f:
+            while True:
+                record = self._queue.get()
+                f.write(json.dumps(record) + '\n')
+                # Flush once the burst is written rather than per record
+                if self._queue.empty():
+                    f.flush()
+                self.written += 1
+
+
+slow_log: Optional[SlowLog] = None
+
+
+def configure_slow_log(path: Optional[str], threshold_ms: float):
+    """Enable the slow-request log; a falsy path leaves it off"""
+    global slow_log
+    slow_log = SlowLog(path, threshold_ms) if path else None
@@ -2,38 +2,344 @@
 """
 Enhanced documentation server with ripgrep search and beautiful typography.
 """
-from http.server import HTTPServer, BaseHTTPRequestHandler
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
 import os
 import json
+import argparse
+import hmac
 import urllib.parse
 import subprocess
-import markdown
+import threading
+import time
 import re
+from collections import Counter
 from pathlib import Path
 import mimetypes
 
+import docs_memory
+import docs_metrics
+import docs_render
+import docs_timing as timing
+from docs_profiler import profiler
+from docs_events import EventHub
+from docs_index import IndexManager, REINDEX_INTERVAL, document_id
+from unix_socket import UnixServerMixin, DEFAULT_MODE, parse_mode
+
+try:
+    import msgpack
+except ImportError:  # Optional: MessagePack responses are offered only when installed
+    msgpack = None
+
+DOCS_ROOT = os.environ.get('DOCS_ROOT', '/home/uprootiny/essays')
+INDEX_SNAPSHOT = os.environ.get(
+    'DOCS_INDEX_SNAPSHOT',
+    os.path.expanduser('~/.cache/enhanced-docs-browser/index.snapshot')
+)
+
+MAX_REQUEST_BODY = 1024 * 1024
+KEEPALIVE_TIMEOUT = 15  # Seconds an idle persistent connection waits for its next request
+MAX_KEEPALIVE_REQUESTS = 1000  # Requests per connection before it is closed and re-opened
+SEARCH_TIMEOUT = 10
+# Admin endpoints are disabled unless a token is configured
+ADMIN_TOKEN = os.environ.get('DOCS_ADMIN_TOKEN', '')
+# Requests slower than DOCS_SLOW_MS are logged with per-stage timings when a path is set
+SLOW_LOG = os.environ.get('DOCS_SLOW_LOG', '')
+SLOW_MS = float(os.environ.get('DOCS_SLOW_MS', '500'))
+COMPACT_JSON = json.JSONEncoder(separators=(',', ':'), check_circular=False)
+MAX_STREAM_RESULTS = 500
+MAX_BATCH_DOCUMENTS = 200
+BATCH_REPRESENTATIONS = {'raw', 'rendered', 'features', 'toc'}
+
+corpus_index = IndexManager(DOCS_ROOT, snapshot_path=INDEX_SNAPSHOT)
+
+event_hub = EventHub()
+MAX_DOCUMENT_EVENTS = 500  # Larger rebuilds are announced as one reset event
+
+def publish_index_changes(generation, changes, previous):
+    """Push a swapped-in index generation to /api/events subscribers"""
+    if changes is None or len(changes) > MAX_DOCUMENT_EVENTS:
+        event_hub.publish('version', {'version': generation.version, 'epoch': corpus_index.epoch, 'reset': True})
+    else:
+        for path, kind in changes.items():
+            event_hub.publish('document', {
+                'version': generation.version,
+                'change': kind,
+                'id': document_id(os.path.relpath(path, generation.root)),
+                'path': path
+            })
+        event_hub.publish('version', {'version': generation.version, 'epoch': corpus_index.epoch, 'reset': False})
+    
+    clusters = Counter(doc.type for doc in generation.documents)
+    if previous is None or clusters != Counter(doc.type for doc in previous.documents):
+        event_hub.publish('clusters', {'version': generation.version, 'clusters': dict(clusters)})
+
+corpus_index.listeners.append(publish_index_changes)
+
+# Routes are labelled by pattern so per-document URLs don't explode metric cardinality
+METRIC_ROUTES = {'/', '/healthz', '/readyz', '/metrics', '/admin/profile', '/admin/memory', '/search', '/api/search', '/api/search/stream',
+                 '/api/files', '/api/files/changes', '/api/events', '/api/content-analysis',
+                 '/api/index-stats', '/api/batch'}
+METRIC_ROUTE_PREFIXES = ('/api/doc/', '/doc/', '/file/', '/raw/')
+
+def metric_route(path):
+    if path in METRIC_ROUTES:
+        return path
+    for prefix in METRIC_ROUTE_PREFIXES:
+        if path.startswith(prefix):
+            return prefix + '*'
+    return 'other'
+
+NAMED_CACHES = {
+    'render': docs_render.render_cache,
+    'block': docs_render.block_cache,
+    'section': docs_render.section_cache,
+    'highlight': docs_render.highlight_cache,
+    'lexer': docs_render.lexer_cache
+}
+
+def cache_stats(attribute):
+    return lambda: {(name,): getattr(cache, attribute) for name, cache in NAMED_CACHES.items()}
+
+docs_metrics.registry.register(docs_metrics.Counter(
+    'docs_cache_hits_total', 'Cache lookups answered from the cache', ('cache',), callback=cache_stats('hits')))
+docs_metrics.registry.register(docs_metrics.Counter(
+    'docs_cache_misses_total', 'Cache lookups that had to compute', ('cache',), callback=cache_stats('misses')))
+docs_metrics.registry.register(docs_metrics.Gauge(
+    'docs_cache_entries', 'Entries held per cache', ('cache',),
+    callback=lambda: {(name,): len(cache) for name, cache in NAMED_CACHES.items()}))
+docs_metrics.registry.register(docs_metrics.Gauge(
+    'docs_corpus_version', 'Version of the index generation being served',
+    callback=lambda: {(): corpus_index.version}))
+docs_metrics.registry.register(docs_metrics.Gauge(
+    'docs_event_subscribers', 'Open /api/events streams', callback=lambda: {(): len(event_hub)}))
+
+# Background warm-up state reported by /readyz
+warmup = {'ready': False, 'phase': 'starting', 'started_at': time.time(), 'error': None}
+
+def iter_search_results(query, limit=50):
+    """Yield ripgrep matches grouped per file as soon as each file's output is complete"""
+    # Use ripgrep for fast search, excluding noise directories
+    process = subprocess.Popen([
+        'rg', '--type', 'md', '-n', '-C', '2', '-i', query,
+        DOCS_ROOT
+    ], stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True)
+    docs_metrics.subprocess_runs.inc('rg')
+    timed_out = threading.Event()
+    
+    def expire():
+        timed_out.set()
+        process.kill()
+    
+    timer = threading.Timer(SEARCH_TIMEOUT, expire)
+    timer.start()
+    
+    current_file = None
+    current_context = []
+    count = 0
+    try:
+        for line in process.stdout:
+            line = line.rstrip('\n')
+            if not line:
+                continue
+            
+            # Parse ripgrep output format: filename:line:content
+            parts = line.split(':', 3)
+            if len(parts) >= 3:
+                file_path = parts[0]
+                line_num = parts[1]
+                content = ':'.join(parts[2:]) if len(parts) > 3 else parts[2]
+                
+                # Skip if it's just a separator line
+                if content.strip() == '--':
+                    continue
+                
+                if current_file != file_path:
+                    if current_file and current_context:
+                        yield {'file': current_file, 'context': '\n'.join(current_context)}
+                        count += 1
+                        if count >= limit:
+                            return
+                    current_file = file_path
+                    current_context = []
+                
+                if line_num.isdigit():
+                    current_context.append(f"{line_num}: {content}")
+                else:
+                    current_context.append(content)
+        
+        # The flag is set before the kill, so a killed rg is always reported;
+        # one that exited on its own just as the timer fired is not
+        if timed_out.is_set() and process.wait() < 0:
+            docs_metrics.subprocess_timeouts.inc('rg')
+            raise subprocess.TimeoutExpired(process.args, SEARCH_TIMEOUT)
+        
+        # Add the last result
+        if current_file and current_context:
+            yield {'file': current_file, 'context': '\n'.join(current_context)}
+    finally:
+        timer.cancel()
+        process.kill()
+        process.stdout.close()
+        process.wait()
+
 class EnhancedDocsHandler(BaseHTTPRequestHandler):
+    # Persistent connections: buffered responses carry Content-Length, streamed ones are chunked
+    protocol_version = 'HTTP/1.1'
+    corpus_version = None
+    status = 0
+    connection_header_sent = False
+    requests_served = 0
+    request_body = None
+
+    def end_headers(self):
+        if self.status < 200:
+            super().end_headers()  # Interim 100 Continue
+            return
+        # Every response names the corpus version it was answered from
+        if self.corpus_version is not None:
+            self.send_header('X-Corpus-Version', str(self.corpus_version))
+        if not self.connection_header_sent:
+            if self.close_connection:
+                self.send_header('Connection', 'close')
+            elif self.request_version == 'HTTP/1.0':
+                # HTTP/1.0 clients only reuse a connection the server explicitly keeps alive
+                self.send_header('Connection', 'keep-alive')
+        super().end_headers()
+
+    def setup(self):
+        super().setup()
+        self.wfile = docs_metrics.CountingWriter(self.wfile)
+
+    def send_response_only(self, code, message=None):
+        self.status = code
+        self.connection_header_sent = False
+        super().send_response_only(code, message)
+
+    def send_header(self, keyword, value):
+        if keyword.lower() == 'connection':
+            self.connection_header_sent = True
+        super().send_header(keyword, value)
+
+    def handle_one_request(self):
+        """Wait up to KEEPALIVE_TIMEOUT for the next request, then answer it"""
+        self.connection.settimeout(KEEPALIVE_TIMEOUT)
+        try:
+            # Buffered bytes of a pipelined request count; EOF or silence ends the connection quietly
+            if not self.rfile.peek(1):
+                self.close_connection = True
+                return
+        except OSError:
+            self.close_connection = True
+            return
+        super().handle_one_request()
+
     def do_GET(self):
+        self.handle_measured(self.route_get)
+
+    def do_POST(self):
+        self.request_body = self.read_request_body()
+        self.handle_measured(self.route_post)
+
+    def handle_measured(self, route):
+        """Answer from a pinned index generation, recording route metrics and slow requests"""
+        label = metric_route(urllib.parse.urlparse(self.path).path)
+        # Idle timeouts apply between requests only; answering one may block on a slow reader
+        self.connection.settimeout(None)
+        self.requests_served += 1
+        if self.requests_served >= MAX_KEEPALIVE_REQUESTS:
+            self.close_connection = True
+        self.status = 0
+        self.wfile.bytes = 0
+        self.wfile.seconds = 0.0
+        timing.begin()
+        started = time.perf_counter()
+        docs_metrics.in_flight.inc(label)
+        try:
+            # Admin requests stay out of the profiles they read
+            with corpus_index.acquire() as generation, profiler.profile(label, enabled=label != '/admin/profile'):
+                self.generation = generation
+                self.corpus_version = generation.version if generation else 0
+                route()
+        finally:
+            elapsed = time.perf_counter() - started
+            stages, notes = timing.end()
+            docs_metrics.in_flight.dec(label)
+            docs_metrics.request_duration.observe(elapsed, label)
+            docs_metrics.response_size.observe(self.wfile.bytes, label)
+            docs_metrics.requests_total.inc(label, self.command, self.status)
+            
+            slow_log = timing.slow_log
+            if slow_log is not None and elapsed >= slow_log.threshold:
+                stages['write'] = self.wfile.seconds
+                stages['other'] = max(0.0, elapsed - sum(stages.values()))
+                slow_log.submit({
+                    'time': time.time(),
+                    'method': self.command,
+                    'path': self.path,
+                    'route': label,
+                    'status': self.status,
+                    'bytes': self.wfile.bytes,
+                    'corpus_version': self.corpus_version,
+                    'duration_ms': round(elapsed * 1000, 2),
+                    'stages_ms': {name: round(seconds * 1000, 2) for name, seconds in stages.items()},
+                    **notes
+                })
+
+    def route_post(self):
+        path = urllib.parse.urlparse(self.path).path
+        
+        if path == '/api/batch':
+            self.serve_api_batch()
+        elif path == '/admin/profile':
+            self.serve_admin_profile_update()
+        elif path == '/admin/memory':
+            self.serve_admin_memory_update()
+        else:
+            self.send_error(404)
+
+    def route_get(self):
         parsed_path = urllib.parse.urlparse(self.path)
         path = parsed_path.path
         query = urllib.parse.parse_qs(parsed_path.query)
         
         if path == '/':
             self.serve_index()
+        elif path == '/healthz':
+            self.serve_healthz()
+        elif path == '/readyz':
+            self.serve_readyz()
+        elif path == '/metrics':
+            self.serve_metrics()
+        elif path == '/admin/profile':
+            self.serve_admin_profile(query)
+        elif path == '/admin/memory':
+            self.serve_admin_memory(query)
         elif path == '/search':
             self.serve_search(query.get('q', [''])[0])
         elif path == '/api/search':
             self.serve_api_search(query.get('q', [''])[0])
+        elif path == '/api/search/stream':
+            self.serve_search_stream(query.get('q', [''])[0], query.get('limit', [''])[0])
         elif path == '/api/files':
             self.serve_api_files()
+        elif path == '/api/events':
+            self.serve_events()
+        elif path == '/api/files/changes':
+            self.serve_api_file_changes(query.get('since', [''])[0], query.get('epoch', [''])[0])
         elif path == '/api/content-analysis':
             self.serve_content_analysis()
+        elif path == '/api/index-stats':
+            self.serve_index_stats()
+        elif path.startswith('/api/doc/'):
+            self.serve_api_doc(path[9:].split('/'))
+        elif path.startswith('/doc/'):
+            self.serve_doc(path[5:].split('/'))
         elif path.startswith('/file/'):
             file_path = urllib.parse.unquote(path[6:])  # Remove '/file/'
-            self.serve_file(file_path)
+            self.serve_path(file_path, '')
         elif path.startswith('/raw/'):
             file_path = urllib.parse.unquote(path[5:])  # Remove '/raw/'
-            self.serve_raw_file(file_path)
+            self.serve_path(file_path, '/raw')
         else:
             self.send_error(404)
 
@@ -503,7 +809,7 @@ class EnhancedDocsHandler(BaseHTTPRequestHandler):
                 }
                 
                 filesList.innerHTML = files.map(file => `
-                    <a href="/file/${encodeURIComponent(file.path)}" class="file-item">
+                    <a href="/doc/${file.id}" class="file-item">
                         <div class="file-name">${file.name}</div>
                         <div class="file-path">${file.path}</div>
                     </a>
@@ -515,10 +821,17 @@ class EnhancedDocsHandler(BaseHTTPRequestHandler):
             }
         }
         
-        async function performSearch() {
+        let activeSearch = null;
+        
+        function performSearch() {
             const query = document.getElementById('searchInput').value.trim();
             const resultsDiv = document.getElementById('searchResults');
             
+            if (activeSearch) {
+                activeSearch.close();
+                activeSearch = null;
+            }
+            
             if (!query) {
                 resultsDiv.style.display = 'none';
                 return;
@@ -527,31 +840,41 @@ class EnhancedDocsHandler(BaseHTTPRequestHandler):
             resultsDiv.style.display = 'block';
             resultsDiv.innerHTML = '<div class="loading">Searching...</div>';
             
-            try {
-                const response = await fetch(`/api/search?q=${encodeURIComponent(query)}`);
-                const results = await response.json();
-                
-                if (results.length === 0) {
-                    resultsDiv.innerHTML = '<div class="loading">No results found</div>';
-                    return;
+            // Results stream in as ripgrep finds them instead of after the whole search
+            const source = new EventSource(`/api/search/stream?q=${encodeURIComponent(query)}`);
+            activeSearch = source;
+            let count = 0;
+            
+            source.addEventListener('result', event => {
+                const result = JSON.parse(event.data);
+                if (count === 0) {
+                    resultsDiv.innerHTML = '<h3 class="section-title">🔍 Search Results (<span class="result-count">0</span>)</h3>';
                 }
-                
-                resultsDiv.innerHTML = `
-                    <h3 class="section-title">🔍 Search Results (${results.length})</h3>
-                    ${results.map(result => `
-                        <div class="result-item">
-                            <div class="result-file">
-                                📄 <a href="/file/${encodeURIComponent(result.file)}">${result.file}</a>
-                                ${result.line ? `(line ${result.line})` : ''}
-                            </div>
-                            ${result.context ? `<div class="result-context">${escapeHtml(result.context)}</div>` : ''}
+                count++;
+                resultsDiv.querySelector('.result-count').textContent = count;
+                resultsDiv.insertAdjacentHTML('beforeend', `
+                    <div class="result-item">
+                        <div class="result-file">
+                            📄 <a href="/file/${encodeURIComponent(result.file)}">${result.file}</a>
                         </div>
-                    `).join('')}
-                `;
-            } catch (error) {
-                console.error('Error searching:', error);
-                resultsDiv.innerHTML = '<div class="loading">Error performing search</div>';
-            }
+                        ${result.context ? `<div class="result-context">${escapeHtml(result.context)}</div>` : ''}
+                    </div>
+                `);
+            });
+            
+            source.addEventListener('summary', () => {
+                source.close();
+                if (count === 0) {
+                    resultsDiv.innerHTML = '<div class="loading">No results found</div>';
+                }
+            });
+            
+            source.addEventListener('error', () => {
+                source.close();
+                if (count === 0) {
+                    resultsDiv.innerHTML = '<div class="loading">Error performing search</div>';
+                }
+            });
         }
         
         function escapeHtml(text) {
@@ -562,169 +885,319 @@ class EnhancedDocsHandler(BaseHTTPRequestHandler):
     </script>
 </body>
 </html>"""
+        self.send_body(html.encode(), 'text/html')
+
+    def send_data(self, data, columns=None, status=200):
+        """Send an API payload in the representation preferred by the Accept header
+
+        MessagePack (when installed) lays list payloads out column by column when
+        columns names their fields; JSON is compact unless ?pretty=1 is given.
+        """
+        accept = self.headers.get('Accept', '')
+        with timing.stage('encode'):
+            if msgpack is not None and ('application/msgpack' in accept or 'application/x-msgpack' in accept):
+                if columns is not None:
+                    data = {'length': len(data), 'columns': {name: [row[name] for row in data] for name in columns}}
+                body = msgpack.packb(data, use_bin_type=True)
+                content_type = 'application/msgpack'
+            elif urllib.parse.parse_qs(urllib.parse.urlparse(self.path).query).get('pretty') == ['1']:
+                body = json.dumps(data, indent=2).encode()
+                content_type = 'application/json'
+            else:
+                body = COMPACT_JSON.encode(data).encode()
+                content_type = 'application/json'
+        
+        self.send_response(status)
+        self.send_header('Content-type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.send_header('Vary', 'Accept')
+        self.end_headers()
+        self.wfile.write(body)
+
+    def send_body(self, body, content_type, status=200):
+        """Send a complete response whose length is known up front"""
+        self.send_response(status)
+        self.send_header('Content-type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def serve_metrics(self):
+        """Prometheus text exposition of request, cache and corpus metrics"""
+        body = docs_metrics.registry.render().encode()
+        self.send_response(200)
+        self.send_header('Content-type', 'text/plain; version=0.0.4; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def check_admin(self):
+        """Admin endpoints need Authorization: Bearer <DOCS_ADMIN_TOKEN>; they 404 when no token is set"""
+        supplied = self.headers.get('Authorization', '')
+        if ADMIN_TOKEN and hmac.compare_digest(supplied.encode(), f'Bearer {ADMIN_TOKEN}'.encode()):
+            return True
+        if ADMIN_TOKEN:
+            self.send_error(403)
+        else:
+            self.send_error(404)
+        return False
+
+    def serve_admin_profile(self, query):
+        """Profiler status, or its per-route report as text, pstats or collapsed stacks"""
+        if not self.check_admin():
+            return
+        
+        output = query.get('format', [''])[0]
+        if not output:
+            self.send_data(profiler.status())
+            return
+        if output not in ('text', 'pstats', 'collapsed'):
+            self.send_error(400, "format must be text, pstats or collapsed")
+            return
+        
+        try:
+            body = profiler.report(route=query.get('route', [None])[0], output=output,
+                                   sort=query.get('sort', ['cumulative'])[0])
+        except KeyError:
+            self.send_error(400, "Unknown sort key")
+            return
+        if body is None:
+            self.send_error(404, "No profile recorded for that route")
+            return
+        
         self.send_response(200)
-        self.send_header('Content-type', 'text/html')
+        self.send_header('Content-type', 'application/octet-stream' if output == 'pstats' else 'text/plain; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def serve_admin_profile_update(self):
+        """Switch profiling at runtime: {"mode": "sample", "rate": 0.05} / {"mode": "window", "seconds": 30} / {"mode": "off"}"""
+        if not self.check_admin():
+            return
+        
+        request = self.read_json_body()
+        try:
+            if not isinstance(request, dict):
+                raise ValueError('Expected a JSON object')
+            profiler.configure(request.get('mode', 'off'), rate=float(request.get('rate', 0)),
+                               seconds=float(request.get('seconds', 0)), reset=bool(request.get('reset')))
+        except (TypeError, ValueError) as e:
+            self.send_data({'error': str(e)}, status=400)
+            return
+        self.send_data(profiler.status())
+
+    def serve_admin_memory(self, query):
+        """Sizes of the named caches and index, plus top allocation sites while tracing"""
+        if not self.check_admin():
+            return
+        
+        limit = query.get('limit', ['25'])[0]
+        try:
+            report = docs_memory.tracer.report(limit=int(limit) if limit.isdigit() else 25,
+                                               group_by=query.get('group_by', ['lineno'])[0])
+        except ValueError as e:
+            self.send_data({'error': str(e)}, status=400)
+            return
+        report['caches'] = docs_memory.cache_report(NAMED_CACHES)
+        report['index'] = self.generation.memory_report() if self.generation else None
+        self.send_data(report)
+
+    def serve_admin_memory_update(self):
+        """Control tracing: {"action": "start", "frames": 10} / {"action": "baseline"} / {"action": "stop"}"""
+        if not self.check_admin():
+            return
+        
+        request = self.read_json_body()
+        action = request.get('action') if isinstance(request, dict) else None
+        try:
+            if action == 'start':
+                docs_memory.tracer.start(int(request.get('frames', docs_memory.TRACE_FRAMES)))
+            elif action == 'baseline':
+                docs_memory.tracer.take_baseline()
+            elif action == 'stop':
+                docs_memory.tracer.stop()
+            else:
+                raise ValueError('action must be start, baseline or stop')
+        except (TypeError, ValueError) as e:
+            self.send_data({'error': str(e)}, status=400)
+            return
+        self.send_data({'tracing': action != 'stop', 'action': action})
+
+    def serve_healthz(self):
+        """Liveness: the process is up and answering"""
+        self.send_data({'status': 'ok'})
+
+    def serve_readyz(self):
+        """Readiness: the index is built and caches are warm"""
+        status = {
+            'ready': warmup['ready'],
+            'phase': warmup['phase'],
+            'index': dict(corpus_index.progress),
+            'version': corpus_index.version,
+            'uptime': round(time.time() - warmup['started_at'], 3)
+        }
+        if warmup['error']:
+            status['error'] = warmup['error']
+        if 'prerender' in warmup:
+            status['prerender'] = dict(warmup['prerender'])
+        
+        self.send_data(status, status=200 if warmup['ready'] else 503)
+
+    def send_not_ready(self):
+        """503 for index-backed endpoints while warm-up is still running"""
+        body = json.dumps({'error': 'Index is warming up', 'index': corpus_index.progress}).encode()
+        self.send_response(503)
+        self.send_header('Content-type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.send_header('Retry-After', '1')
         self.end_headers()
-        self.wfile.write(html.encode())
+        self.wfile.write(body)
 
     def serve_api_files(self):
-        """Get all markdown files using ripgrep for fast discovery"""
+        """Get all markdown files from the current index generation"""
+        if self.generation is None:
+            self.send_not_ready()
+            return
+        
         try:
-            # Use ripgrep to find all .md files, excluding noise directories
-            result = subprocess.run([
-                'rg', '--files', '--type', 'md', 
-                '/home/uprootiny/essays'
-            ], capture_output=True, text=True, timeout=10)
+            documents = self.generation.documents
+            files = [{
+                'id': doc.id,
+                'name': doc.name,
+                'path': doc.path,
+                'content': doc.content
+            } for doc in documents]
+            timing.note('results', len(files))
             
-            files = []
-            if result.returncode == 0:
-                for line in result.stdout.strip().split('\n'):
-                    if line:
-                        path = line.strip()
-                        name = os.path.basename(path)
-                        
-                        # Load content for API
-                        content = ""
-                        try:
-                            with open(path, 'r', encoding='utf-8') as f:
-                                content = f.read()
-                        except Exception:
-                            content = ""  # Empty content if file can't be read
-                        
-                        files.append({
-                            'name': name,
-                            'path': path,
-                            'content': content
-                        })
-            
-            # Sort by name
-            files.sort(key=lambda x: x['name'].lower())
-            
-            self.send_response(200)
-            self.send_header('Content-type', 'application/json')
-            self.end_headers()
-            self.wfile.write(json.dumps(files, indent=2).encode())
+            self.send_data(files, columns=('id', 'name', 'path', 'content'))
         except Exception as e:
-            self.send_response(500)
-            self.send_header('Content-type', 'application/json')
-            self.end_headers()
-            self.wfile.write(json.dumps({'error': str(e)}).encode())
+            self.send_data({'error': str(e)}, status=500)
+
+    def serve_api_file_changes(self, since, epoch):
+        """Documents added, changed or deleted since a client's last sync, or a full reset"""
+        if self.generation is None:
+            self.send_not_ready()
+            return
+        
+        generation = self.generation
+        changes = None
+        if since.isdigit() and epoch == corpus_index.epoch:
+            changes = corpus_index.changes_since(int(since), generation.version)
+        
+        response = {'epoch': corpus_index.epoch, 'version': generation.version, 'reset': changes is None}
+        if changes is None:
+            changed = list(generation.documents)
+            response['deleted'] = []
+        else:
+            changed = [doc for doc in (generation.get(path) for path, kind in changes.items() if kind != 'deleted')
+                       if doc is not None]
+            response['deleted'] = [{'id': document_id(os.path.relpath(path, generation.root)), 'path': path}
+                                   for path, kind in changes.items() if kind == 'deleted']
+        response['changed'] = [{
+            'id': doc.id,
+            'name': doc.name,
+            'path': doc.path,
+            'content': doc.content
+        } for doc in changed]
+        
+        self.send_data(response)
+
+    def serve_events(self):
+        """Server-Sent Events stream of document, version and cluster changes"""
+        if event_hub.full:
+            self.send_error(503, "Too many event subscribers")
+            return
+        
+        self.send_response(200)
+        self.send_header('Content-type', 'text/event-stream')
+        self.send_header('Cache-Control', 'no-cache')
+        self.send_header('X-Accel-Buffering', 'no')  # Let nginx pass events straight through
+        # The stream never ends on its own, so it is delimited by closing the connection
+        self.close_connection = True
+        self.end_headers()
+        self.wfile.flush()
+        
+        # Hand the socket to the hub's selector loop and free this thread
+        self.server.detach(self.connection)
+        event_hub.subscribe(self.connection, self.headers.get('Last-Event-ID'))
+
+    def serve_search_stream(self, query, limit):
+        """Stream search results as Server-Sent Events as soon as ripgrep finds them"""
+        if not query:
+            self.send_data({'error': 'No query provided'}, status=400)
+            return
+        limit = min(int(limit), MAX_STREAM_RESULTS) if limit.isdigit() else 50
+        
+        # Unbuffered through nginx, or the first hit waits for the proxy buffer to fill
+        self.start_chunked(200, 'text/event-stream', {'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+        started = time.time()
+        first_result_ms = None
+        total = 0
+        truncated = False
+        try:
+            # One result past the limit tells a cut-off list from one that is exactly full
+            for result in timing.timed(iter_search_results(query, limit=limit + 1), 'subprocess'):
+                if total == limit:
+                    truncated = True
+                    break
+                if first_result_ms is None:
+                    first_result_ms = round((time.time() - started) * 1000, 1)
+                total += 1
+                self.write_chunk(f"event: result\ndata: {json.dumps(result)}\n\n".encode())
+            timing.note('results', total)
+            summary = {
+                'total': total,
+                'truncated': truncated,
+                'first_result_ms': first_result_ms,
+                'elapsed_ms': round((time.time() - started) * 1000, 1)
+            }
+            self.write_chunk(f"event: summary\ndata: {json.dumps(summary)}\n\n".encode())
+        except (BrokenPipeError, ConnectionResetError):
+            return
+        except subprocess.TimeoutExpired:
+            self.write_chunk(f"event: error\ndata: {json.dumps({'error': 'Search timeout', 'total': total})}\n\n".encode())
+        except Exception as e:
+            self.write_chunk(f"event: error\ndata: {json.dumps({'error': str(e), 'total': total})}\n\n".encode())
+        self.end_chunked()
 
     def serve_api_search(self, query):
         """Search using ripgrep for fast full-text search"""
         if not query:
-            self.send_response(400)
-            self.send_header('Content-type', 'application/json')
-            self.end_headers()
-            self.wfile.write(json.dumps({'error': 'No query provided'}).encode())
+            self.send_data({'error': 'No query provided'}, status=400)
             return
         
         try:
-            # Use ripgrep for fast search, excluding noise directories
-            result = subprocess.run([
-                'rg', '--type', 'md', '-n', '-C', '2', '-i', query,
-                '/home/uprootiny/essays'
-            ], capture_output=True, text=True, timeout=10)
-            
-            results = []
-            current_file = None
-            current_context = []
-            
-            if result.returncode == 0:
-                lines = result.stdout.strip().split('\n')
-                for line in lines:
-                    if not line:
-                        continue
-                    
-                    # Parse ripgrep output format: filename:line:content
-                    parts = line.split(':', 3)
-                    if len(parts) >= 3:
-                        file_path = parts[0]
-                        line_num = parts[1]
-                        content = ':'.join(parts[2:]) if len(parts) > 3 else parts[2]
-                        
-                        # Skip if it's just a separator line
-                        if content.strip() == '--':
-                            continue
-                        
-                        if current_file != file_path:
-                            if current_file and current_context:
-                                results.append({
-                                    'file': current_file,
-                                    'context': '\n'.join(current_context)
-                                })
-                            current_file = file_path
-                            current_context = []
-                        
-                        if line_num.isdigit():
-                            current_context.append(f"{line_num}: {content}")
-                        else:
-                            current_context.append(content)
-                
-                # Add the last result
-                if current_file and current_context:
-                    results.append({
-                        'file': current_file,
-                        'context': '\n'.join(current_context)
-                    })
-            
             # Limit results to prevent overwhelming
-            results = results[:50]
+            results = list(timing.timed(iter_search_results(query, limit=50), 'subprocess'))
+            timing.note('results', len(results))
             
-            self.send_response(200)
-            self.send_header('Content-type', 'application/json')
-            self.end_headers()
-            self.wfile.write(json.dumps(results, indent=2).encode())
+            self.send_data(results, columns=('file', 'context'))
             
         except subprocess.TimeoutExpired:
-            self.send_response(500)
-            self.send_header('Content-type', 'application/json')
-            self.end_headers()
-            self.wfile.write(json.dumps({'error': 'Search timeout'}).encode())
+            self.send_data({'error': 'Search timeout'}, status=500)
         except Exception as e:
-            self.send_response(500)
-            self.send_header('Content-type', 'application/json')
-            self.end_headers()
-            self.wfile.write(json.dumps({'error': str(e)}).encode())
+            self.send_data({'error': str(e)}, status=500)
 
     def serve_content_analysis(self):
         """Provide document analysis and clustering information"""
+        if self.generation is None:
+            self.send_not_ready()
+            return
+        
         try:
-            # Use ripgrep to get a sample of document content for analysis
-            result = subprocess.run([
-                'rg', '--files', '--type', 'md', 
-                '/home/uprootiny/essays'
-            ], capture_output=True, text=True, timeout=10)
-            
-            files = []
-            if result.returncode == 0:
-                files = [line.strip() for line in result.stdout.strip().split('\n') if line]
+            documents = self.generation.documents
             
-            # Simple clustering by filename patterns
+            # Simple clustering by filename patterns (classified at index time)
             clusters = {}
-            for file_path in files:
-                filename = os.path.basename(file_path).lower()
-                
-                if 'roadmap' in filename or 'plan' in filename:
-                    cluster_type = 'roadmap'
-                elif 'technical' in filename or 'architecture' in filename or 'api' in filename:
-                    cluster_type = 'technical'
-                elif 'essay' in filename or 'thought' in filename:
-                    cluster_type = 'essay'
-                elif 'analysis' in filename or 'report' in filename or 'assessment' in filename:
-                    cluster_type = 'analysis'
-                elif 'project' in filename or 'implementation' in filename:
-                    cluster_type = 'project'
-                elif 'memo' in filename or 'note' in filename or 'brief' in filename:
-                    cluster_type = 'memo'
-                else:
-                    cluster_type = 'technical'
+            for doc in documents:
+                cluster_type = doc.type
                 
                 if cluster_type not in clusters:
                     clusters[cluster_type] = []
                 clusters[cluster_type].append({
-                    'path': file_path,
-                    'name': os.path.basename(file_path)
+                    'path': doc.path,
+                    'name': doc.name
                 })
             
             # Format clusters for frontend
@@ -739,20 +1212,190 @@ class EnhancedDocsHandler(BaseHTTPRequestHandler):
             
             analysis = {
                 'clusters': formatted_clusters,
-                'total_documents': len(files),
+                'total_documents': len(documents),
                 'cluster_count': len(clusters)
             }
             
-            self.send_response(200)
-            self.send_header('Content-type', 'application/json')
-            self.end_headers()
-            self.wfile.write(json.dumps(analysis, indent=2).encode())
+            self.send_data(analysis)
             
         except Exception as e:
-            self.send_response(500)
-            self.send_header('Content-type', 'application/json')
+            self.send_data({'error': str(e)}, status=500)
+
+    def serve_index_stats(self):
+        """Report memory used by the resident corpus index"""
+        stats = self.generation.memory_report() if self.generation else {'documents': 0}
+        stats['version'] = self.corpus_version
+        
+        self.send_data(stats)
+
+    def serve_api_doc(self, parts):
+        """Section table of contents, or one rendered section, of a document by id"""
+        if self.generation is None:
+            self.send_not_ready()
+            return
+        
+        doc = self.generation.get_by_id(parts[0])
+        if doc is None or not os.path.exists(doc.path):
+            self.send_error(404)
+            return
+        
+        try:
+            sections = docs_render.document_sections(doc.path)
+            if parts[1:] == ['sections']:
+                self.send_data({
+                    'id': doc.id,
+                    'path': doc.path,
+                    'bytes': os.path.getsize(doc.path),
+                    'sections': [{
+                        'index': n,
+                        'start': section['start'],
+                        'end': section['end'],
+                        'headings': section['headings']
+                    } for n, section in enumerate(sections)]
+                })
+            elif len(parts) == 3 and parts[1] == 'section' and parts[2].isdigit() and int(parts[2]) < len(sections):
+                html = docs_render.document_section_html(doc.path, sections, int(parts[2]))
+                self.send_body(html.encode(), 'text/html; charset=utf-8')
+            else:
+                self.send_error(404)
+        except Exception as e:
+            self.send_data({'error': str(e)}, status=500)
+
+    def start_chunked(self, status, content_type, headers=None):
+        """Begin a streamed response: chunked for HTTP/1.1 clients, close-delimited otherwise"""
+        self.chunked = self.request_version == 'HTTP/1.1'
+        if not self.chunked:
+            self.close_connection = True
+        self.send_response(status)
+        self.send_header('Content-type', content_type)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        if self.chunked:
+            self.send_header('Transfer-Encoding', 'chunked')
+        self.end_headers()
+
+    def write_chunk(self, data):
+        if not data:
+            return
+        if self.chunked:
+            self.wfile.write(b'%x\r\n%s\r\n' % (len(data), data))
+        else:
+            self.wfile.write(data)
+        self.wfile.flush()
+
+    def end_chunked(self):
+        if self.chunked:
+            self.wfile.write(b'0\r\n\r\n')
+        self.wfile.flush()
+
+    def read_request_body(self):
+        """Read the whole request body so the connection is positioned at the next request
+
+        A body that cannot be read (chunked, oversized or mis-declared) is left
+        unread and the connection is closed after the response instead.
+        """
+        try:
+            length = int(self.headers.get('Content-Length', 0))
+        except ValueError:
+            length = -1
+        if 'Transfer-Encoding' in self.headers or length < 0 or length > MAX_REQUEST_BODY:
+            self.close_connection = True
+            return None
+        return self.rfile.read(length) if length else b''
+
+    def read_json_body(self):
+        """Parse the JSON request body, or None when it is missing, too large or malformed"""
+        if not self.request_body:
+            return None
+        try:
+            return json.loads(self.request_body)
+        except ValueError:
+            return None
+
+    def serve_api_batch(self):
+        """Fetch many documents in one request, streamed back as NDJSON"""
+        if self.generation is None:
+            self.send_not_ready()
+            return
+        
+        request = self.read_json_body()
+        documents = request.get('documents') if isinstance(request, dict) else None
+        representations = request.get('representations', ['raw']) if isinstance(request, dict) else None
+        if (not isinstance(documents, list) or not documents or len(documents) > MAX_BATCH_DOCUMENTS
+                or not isinstance(representations, list)
+                or not all(isinstance(r, str) for r in representations)
+                or not set(representations) <= BATCH_REPRESENTATIONS):
+            self.send_data({
+                'error': f'Expected {{"documents": [...], "representations": [...]}} with at most '
+                         f'{MAX_BATCH_DOCUMENTS} documents and representations from {sorted(BATCH_REPRESENTATIONS)}'
+            }, status=400)
+            return
+        
+        timing.note('results', len(documents))
+        self.start_chunked(200, 'application/x-ndjson')
+        try:
+            for key in documents:
+                self.write_chunk((json.dumps(self.batch_entry(key, representations)) + '\n').encode())
+        except (BrokenPipeError, ConnectionResetError):
+            return
+        self.end_chunked()
+
+    def batch_entry(self, key, representations):
+        """One document of a batch response, looked up by id or by path"""
+        doc = None
+        if isinstance(key, str):
+            doc = self.generation.get_by_id(key) or self.generation.get(key)
+        if doc is None:
+            return {'key': key, 'error': 'not found'}
+        
+        entry = {'key': key, 'id': doc.id, 'path': doc.path, 'name': doc.name}
+        try:
+            if 'raw' in representations:
+                entry['raw'] = doc.content
+            if 'rendered' in representations:
+                entry['rendered'] = docs_render.render_document(doc.path)
+            if 'features' in representations:
+                entry['features'] = {
+                    'type': doc.type,
+                    'size': doc.size,
+                    'mtime': doc.mtime,
+                    'words': len(doc.raw.split())
+                }
+            if 'toc' in representations:
+                entry['toc'] = [heading for section in docs_render.document_sections(doc.path)
+                                for heading in section['headings']]
+        except Exception as e:
+            entry['error'] = str(e)
+        return entry
+
+    def serve_doc(self, parts):
+        """Rendered page or raw source of a document by id: one dict lookup, no path handling"""
+        doc = self.generation.get_by_id(parts[0]) if self.generation else None
+        if doc is None or len(parts) > 2 or parts[1:] not in ([], ['raw']):
+            self.send_error(404)
+        elif parts[1:] == ['raw']:
+            self.serve_raw_file(doc.path)
+        else:
+            self.serve_file(doc.path)
+
+    def serve_path(self, file_path, suffix):
+        """Redirect a path-based URL to its /doc/ id; unindexed files under the root are served in place"""
+        doc = self.generation.resolve(file_path) if self.generation else None
+        if doc is not None:
+            self.send_response(301)
+            self.send_header('Location', f'/doc/{doc.id}{suffix}')
+            self.send_header('Content-Length', '0')
             self.end_headers()
-            self.wfile.write(json.dumps({'error': str(e)}).encode())
+            return
+        
+        # Not indexed yet (new file or still warming up): only files inside the corpus root
+        real_path = os.path.realpath(os.path.join(DOCS_ROOT, file_path))
+        if not real_path.startswith(os.path.realpath(DOCS_ROOT) + os.sep) or not real_path.endswith('.md'):
+            self.send_error(404)
+        elif suffix == '/raw':
+            self.serve_raw_file(real_path)
+        else:
+            self.serve_file(real_path)
 
     def serve_file(self, file_path):
         """Serve a markdown file with beautiful formatting"""
@@ -761,203 +1404,32 @@ class EnhancedDocsHandler(BaseHTTPRequestHandler):
                 self.send_error(404)
                 return
             
-            with open(file_path, 'r', encoding='utf-8') as f:
-                content = f.read()
-            
-            # Convert markdown to HTML
-            md = markdown.Markdown(extensions=['codehilite', 'fenced_code', 'tables', 'toc'])
-            html_content = md.convert(content)
-            
-            html = f"""<!DOCTYPE html>
-<html lang="en">
-<head>
-    <meta charset="UTF-8">
-    <meta name="viewport" content="width=device-width, initial-scale=1.0">
-    <title>{os.path.basename(file_path)}</title>
-    <style>
-        * {{
-            margin: 0;
-            padding: 0;
-            box-sizing: border-box;
-        }}
-        
-        body {{
-            font-family: 'Inter Tight', 'Atkinson Hyperlegible', sans-serif;
-            line-height: 1.7;
-            color: #2d3748;
-            background: #f7fafc;
-            padding: 2rem;
-        }}
-        
-        .container {{
-            max-width: 900px;
-            margin: 0 auto;
-            background: white;
-            border-radius: 12px;
-            box-shadow: 0 4px 6px -1px rgba(0,0,0,0.1);
-            overflow: hidden;
-        }}
-        
-        .header {{
-            background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
-            color: white;
-            padding: 2rem;
-            text-align: center;
-        }}
-        
-        .header h1 {{
-            font-size: 2rem;
-            margin-bottom: 0.5rem;
-        }}
-        
-        .file-path {{
-            font-family: 'JetBrains Mono', 'Fira Code', 'Cascadia Code', monospace;
-            opacity: 0.9;
-            font-size: 0.9rem;
-        }}
-        
-        .nav {{
-            padding: 1rem 2rem;
-            border-bottom: 1px solid #e2e8f0;
-            background: #f7fafc;
-        }}
-        
-        .nav a {{
-            color: #667eea;
-            text-decoration: none;
-            font-weight: 600;
-        }}
-        
-        .nav a:hover {{
-            text-decoration: underline;
-        }}
-        
-        .content {{
-            padding: 3rem;
-            max-width: none;
-        }}
-        
-        .content h1, .content h2, .content h3, .content h4, .content h5, .content h6 {{
-            margin-top: 2rem;
-            margin-bottom: 1rem;
-            color: #1a202c;
-            line-height: 1.3;
-        }}
-        
-        .content h1 {{ font-size: 2.5rem; border-bottom: 2px solid #e2e8f0; padding-bottom: 0.5rem; }}
-        .content h2 {{ font-size: 2rem; }}
-        .content h3 {{ font-size: 1.5rem; }}
-        .content h4 {{ font-size: 1.25rem; }}
-        
-        .content p {{
-            margin-bottom: 1.5rem;
-            text-align: justify;
-        }}
-        
-        .content ul, .content ol {{
-            margin-bottom: 1.5rem;
-            padding-left: 2rem;
-        }}
-        
-        .content li {{
-            margin-bottom: 0.5rem;
-        }}
-        
-        .content code {{
-            background: #edf2f7;
-            padding: 0.2rem 0.4rem;
-            border-radius: 4px;
-            font-family: 'JetBrains Mono', 'Fira Code', 'Cascadia Code', monospace;
-            font-size: 0.9em;
-        }}
-        
-        .content pre {{
-            background: #2d3748;
-            color: #e2e8f0;
-            padding: 1.5rem;
-            border-radius: 8px;
-            overflow-x: auto;
-            margin-bottom: 1.5rem;
-        }}
-        
-        .content pre code {{
-            background: none;
-            padding: 0;
-            color: inherit;
-        }}
-        
-        .content blockquote {{
-            border-left: 4px solid #667eea;
-            padding-left: 1.5rem;
-            margin: 1.5rem 0;
-            font-style: italic;
-            color: #4a5568;
-        }}
-        
-        .content table {{
-            width: 100%;
-            border-collapse: collapse;
-            margin-bottom: 1.5rem;
-        }}
-        
-        .content th, .content td {{
-            border: 1px solid #e2e8f0;
-            padding: 0.75rem;
-            text-align: left;
-        }}
-        
-        .content th {{
-            background: #f7fafc;
-            font-weight: 600;
-        }}
-        
-        .content a {{
-            color: #667eea;
-            text-decoration: none;
-            border-bottom: 1px dotted #667eea;
-        }}
-        
-        .content a:hover {{
-            background: #edf2f7;
-            text-decoration: none;
-            border-bottom: 1px solid #667eea;
-        }}
-        
-        @media (max-width: 768px) {{
-            body {{ padding: 1rem; }}
-            .content {{ padding: 2rem 1.5rem; }}
-            .content h1 {{ font-size: 2rem; }}
-            .content h2 {{ font-size: 1.5rem; }}
-        }}
-    </style>
-</head>
-<body>
-    <div class="container">
-        <div class="header">
-            <h1>📄 {os.path.basename(file_path)}</h1>
-            <div class="file-path">{file_path}</div>
-        </div>
-        
-        <div class="nav">
-            <a href="/">← Back to Browser</a>
-            <span style="margin: 0 1rem;">|</span>
-            <a href="/raw/{urllib.parse.quote(file_path)}">View Raw</a>
-        </div>
-        
-        <div class="content">
-            {html_content}
-        </div>
-    </div>
-</body>
-</html>"""
-            
-            self.send_response(200)
-            self.send_header('Content-type', 'text/html')
-            self.end_headers()
-            self.wfile.write(html.encode())
-            
+            # Large documents paint their first section and fetch the rest while scrolling
+            doc = self.generation.get(file_path) if self.generation else None
+            lazy = doc is not None and os.path.getsize(file_path) > docs_render.LAZY_SECTION_BYTES
+            head, tail = docs_render.page_parts(file_path)
         except Exception as e:
             self.send_error(500)
+            return
+        
+        # Send the page head and styles at once, then content as each batch of blocks renders
+        self.start_chunked(200, 'text/html')
+        try:
+            self.write_chunk(head.encode())
+            if lazy:
+                sections = docs_render.document_sections(file_path)
+                self.write_chunk(docs_render.document_section_html(file_path, sections, 0).encode())
+                self.write_chunk(docs_render.lazy_placeholders(doc.id, sections).encode())
+            else:
+                for piece in docs_render.stream_document(file_path):
+                    self.write_chunk(piece.encode())
+        except (BrokenPipeError, ConnectionResetError):
+            return
+        except Exception as e:
+            # Headers are already out; close the page with an inline error instead
+            self.write_chunk(b'<p class="render-error">Rendering failed.</p>')
+        self.write_chunk(tail.encode())
+        self.end_chunked()
 
     def serve_raw_file(self, file_path):
         """Serve raw markdown file"""
@@ -969,22 +1441,144 @@ class EnhancedDocsHandler(BaseHTTPRequestHandler):
             with open(file_path, 'r', encoding='utf-8') as f:
                 content = f.read()
             
-            self.send_response(200)
-            self.send_header('Content-type', 'text/plain; charset=utf-8')
-            self.end_headers()
-            self.wfile.write(content.encode())
+            self.send_body(content.encode(), 'text/plain; charset=utf-8')
             
         except Exception as e:
             self.send_error(500)
 
-def run_server(port=44500):
-    server_address = ('0.0.0.0', port)
-    httpd = HTTPServer(server_address, EnhancedDocsHandler)
-    print(f"🚀 Enhanced Documentation Server running at http://0.0.0.0:{port}")
+def warm_up(prerender=None):
+    """Build the index and warm caches after the socket is bound"""
+    try:
+        warmup['phase'] = 'restoring'
+        if corpus_index.load_snapshot():
+            print(f"📦 Restored index snapshot v{corpus_index.version} "
+                  f"in {time.time() - warmup['started_at']:.2f}s")
+        warmup['phase'] = 'indexing'
+        corpus_index.rebuild()
+        warmup['phase'] = 'rendering'
+        docs_render.warm_up()
+        warmup['phase'] = 'ready'
+        warmup['ready'] = True
+        print(f"✅ Warm-up finished in {time.time() - warmup['started_at']:.2f}s "
+              f"({corpus_index.progress['total']} documents)")
+    except Exception as e:
+        warmup['phase'] = 'failed'
+        warmup['error'] = str(e)
+        print(f"⚠️  Warm-up failed: {e}")
+    corpus_index.start_background(REINDEX_INTERVAL)
+    
+    if prerender and warmup['ready']:
+        prerender_corpus(**prerender)
+
+def prerender_corpus(top=0, access_log=None, workers=None, rate=0):
+    """Fill the render cache for the whole corpus, or the most read documents"""
+    with corpus_index.acquire() as generation:
+        paths = [doc.path for doc in generation.documents] if generation else []
+    if top and access_log:
+        with corpus_index.acquire() as generation:
+            popular = [generation.get_by_id(key) or generation.resolve(key)
+                       for key in docs_render.popular_documents(access_log, top)] if generation else []
+        paths = list(dict.fromkeys(doc.path for doc in popular if doc is not None))
+    elif top:
+        paths = paths[:top]
+    
+    warmup['prerender'] = {'done': 0, 'failed': 0, 'total': len(paths)}
+    print(f"🖨️  Pre-rendering {len(paths)} documents")
+    try:
+        result = docs_render.prerender(paths, workers=workers, rate=rate, progress=warmup['prerender'])
+        print(f"✅ Pre-rendered {result['done']} documents in {result['seconds']}s "
+              f"({result['failed']} failed)")
+    except Exception as e:
+        print(f"⚠️  Pre-rendering failed: {e}")
+
+class DocsHTTPServer(ThreadingHTTPServer):
+    """Threading server that can hand finished request sockets to the event hub"""
+    request_queue_size = 128  # Reconnect storms of event subscribers arrive all at once
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._detached = set()
+        self._detached_lock = threading.Lock()
+
+    def detach(self, request):
+        """Keep a request's socket open after its handler returns"""
+        with self._detached_lock:
+            self._detached.add(request)
+
+    def shutdown_request(self, request):
+        with self._detached_lock:
+            if request in self._detached:
+                self._detached.discard(request)
+                return
+        super().shutdown_request(request)
+
+class UnixDocsHTTPServer(UnixServerMixin, DocsHTTPServer):
+    """DocsHTTPServer on a Unix domain socket, for nginx on the same host"""
+
+def run_server(port=44500, prerender=None, unix_socket=None, socket_mode=DEFAULT_MODE):
+    if unix_socket:
+        UnixDocsHTTPServer.socket_mode = socket_mode
+        httpd = UnixDocsHTTPServer(unix_socket, EnhancedDocsHandler)
+        location = f"unix:{unix_socket}"
+    else:
+        httpd = DocsHTTPServer(('0.0.0.0', port), EnhancedDocsHandler)
+        location = f"http://0.0.0.0:{port}"
+    event_hub.start()
+    threading.Thread(target=warm_up, args=(prerender,), name='warm-up', daemon=True).start()
+    print(f"🚀 Enhanced Documentation Server running at {location}")
     print(f"   Search across hundreds of essays and technical documents")
     print(f"   Beautiful typography and responsive design")
     print(f"   Powered by ripgrep for fast full-text search")
-    httpd.serve_forever()
+    try:
+        httpd.serve_forever()
+    finally:
+        httpd.server_close()
+
+def main():
+    parser = argparse.ArgumentParser(description="Enhanced documentation server")
+    parser.add_argument('--port', type=int, default=44500)
+    parser.add_argument('--unix-socket', metavar='PATH',
+                        help="Listen on a Unix domain socket instead of the TCP port")
+    parser.add_argument('--unix-socket-mode', type=parse_mode, default=DEFAULT_MODE, metavar='MODE',
+                        help="Octal permissions of the socket file (default: 660)")
+    parser.add_argument('--prerender', action='store_true',
+                        help="Render the corpus into the HTML cache after warm-up")
+    parser.add_argument('--prerender-top', type=int, default=0, metavar='N',
+                        help="Only pre-render the N most read documents")
+    parser.add_argument('--access-log', metavar='PATH',
+                        help="nginx access log used to rank documents for --prerender-top")
+    parser.add_argument('--prerender-workers', type=int, default=None, metavar='N',
+                        help="Renderer processes (default: all cores but one)")
+    parser.add_argument('--prerender-rate', type=float, default=0, metavar='DOCS_PER_SEC',
+                        help="Cap on documents submitted per second (default: unlimited)")
+    parser.add_argument('--slow-log', default=SLOW_LOG, metavar='PATH',
+                        help="Append slow requests with per-stage timings as JSON lines (default: DOCS_SLOW_LOG)")
+    parser.add_argument('--slow-ms', type=float, default=SLOW_MS, metavar='MS',
+                        help="Slow-request threshold in milliseconds (default: DOCS_SLOW_MS or 500)")
+    
+    commands = parser.add_subparsers(dest='command')
+    export = commands.add_parser('export', help="Render the corpus to static HTML for nginx")
+    export.add_argument('out_dir', help="Output directory")
+    export.add_argument('--root', default=DOCS_ROOT, help="Markdown root (default: DOCS_ROOT)")
+    export.add_argument('--workers', type=int, default=None, help="Renderer processes (default: all cores)")
+    export.add_argument('--force', action='store_true', help="Re-render unchanged documents too")
+    args = parser.parse_args()
+    
+    if args.command == 'export':
+        import docs_export
+        summary = docs_export.export_site(args.root, args.out_dir, workers=args.workers, force=args.force)
+        raise SystemExit(1 if summary['failed'] else 0)
+    
+    timing.configure_slow_log(args.slow_log, args.slow_ms)
+    prerender = None
+    if args.prerender or args.prerender_top:
+        prerender = {
+            'top': args.prerender_top,
+            'access_log': args.access_log,
+            'workers': args.prerender_workers,
+            'rate': args.prerender_rate
+        }
+    run_server(args.port, prerender=prerender, unix_socket=args.unix_socket, socket_mode=args.unix_socket_mode)
 
 if __name__ == '__main__':
-    run_server()
\ No newline at end of file
+    main()
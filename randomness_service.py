@@ -5,6 +5,7 @@
 Sophisticated randomness caching and distribution system for Silver Lining ecosystem
 """
 
+import argparse
 import asyncio
 import json
 import time
@@ -23,6 +24,8 @@ from fastapi.responses import JSONResponse
 from fastapi.middleware.cors import CORSMiddleware
 import uvicorn
 
+from unix_socket import bind_unix_socket, unlink_socket, DEFAULT_MODE, parse_mode
+
 # Configuration
 RANDOMNESS_CACHE_SIZE = 10000
 ENTROPY_POOL_SIZE = 1000
@@ -402,12 +405,24 @@ async def startup_event():
 
 def main():
     """Run the randomness service"""
-    uvicorn.run(
-        app,
-        host="0.0.0.0", 
-        port=SERVICE_PORT,
-        log_level="info"
-    )
+    parser = argparse.ArgumentParser(description="Silver Lining randomness service")
+    parser.add_argument('--unix-socket', metavar='PATH',
+                        help=f"Listen on a Unix domain socket instead of port {SERVICE_PORT}")
+    parser.add_argument('--unix-socket-mode', type=parse_mode, default=DEFAULT_MODE, metavar='MODE',
+                        help="Octal permissions of the socket file (default: 660)")
+    args = parser.parse_args()
+    
+    if not args.unix_socket:
+        uvicorn.run(app, host="0.0.0.0", port=SERVICE_PORT, log_level="info")
+        return
+    
+    # Bound here rather than with uvicorn's uds=, which always makes the socket world-writable
+    sock = bind_unix_socket(args.unix_socket, args.unix_socket_mode)
+    try:
+        uvicorn.run(app, fd=sock.fileno(), log_level="info")
+    finally:
+        sock.close()
+        unlink_socket(args.unix_socket)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -6,6 +6,7 @@ A serene, stable service for quiet reflection and steady wisdom
 Counterbalance to the dynamic randomness systems
 """
 
+import argparse
 import time
 import json
 from datetime import datetime, timedelta
@@ -18,6 +19,8 @@ from fastapi.staticfiles import StaticFiles
 from fastapi.middleware.cors import CORSMiddleware
 import uvicorn
 
+from unix_socket import bind_unix_socket, unlink_socket, DEFAULT_MODE, parse_mode
+
 # Configuration for stability and calm
 SHRINE_PORT = 44777  # Stable, memorable port
 SHRINE_REFRESH_INTERVAL = 3600  # 1 hour - very stable
@@ -532,12 +535,24 @@ async def shrine_startup():
 
 def main():
     """Run the serene shrine service"""
-    uvicorn.run(
-        app,
-        host="0.0.0.0",
-        port=SHRINE_PORT,
-        log_level="warning"  # Quiet logging for serenity
-    )
+    parser = argparse.ArgumentParser(description="The Shrine contemplative service")
+    parser.add_argument('--unix-socket', metavar='PATH',
+                        help=f"Listen on a Unix domain socket instead of port {SHRINE_PORT}")
+    parser.add_argument('--unix-socket-mode', type=parse_mode, default=DEFAULT_MODE, metavar='MODE',
+                        help="Octal permissions of the socket file (default: 660)")
+    args = parser.parse_args()
+    
+    if not args.unix_socket:
+        uvicorn.run(app, host="0.0.0.0", port=SHRINE_PORT, log_level="warning")  # Quiet logging for serenity
+        return
+    
+    # Bound here rather than with uvicorn's uds=, which always makes the socket world-writable
+    sock = bind_unix_socket(args.unix_socket, args.unix_socket_mode)
+    try:
+        uvicorn.run(app, fd=sock.fileno(), log_level="warning")
+    finally:
+        sock.close()
+        unlink_socket(args.unix_socket)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
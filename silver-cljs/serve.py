@@ -5,11 +5,17 @@
 Serves the sophisticated semantic exploration interface
 """
 
+import argparse
 import http.server
-import socketserver
 import os
+import socketserver
+import sys
 from urllib.parse import urlparse
 
+# The Unix socket helpers are shared with the services at the repository root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from unix_socket import UnixServerMixin, DEFAULT_MODE, parse_mode
+
 class SilverCORSHTTPRequestHandler(http.server.SimpleHTTPRequestHandler):
     def end_headers(self):
         self.send_header('Access-Control-Allow-Origin', '*')
@@ -27,15 +33,36 @@ class SilverCORSHTTPRequestHandler(http.server.SimpleHTTPRequestHandler):
             return 'application/javascript'
         return super().guess_type(path)
 
+
+class UnixHTTPServer(UnixServerMixin, socketserver.TCPServer):
+    """Serve on a Unix domain socket, for nginx on the same host"""
+
 def main():
     PORT = 45503  # High port as requested
     
+    parser = argparse.ArgumentParser(description="Silver Lining ClojureScript static server")
+    parser.add_argument('--unix-socket', metavar='PATH',
+                        help=f"Listen on a Unix domain socket instead of port {PORT}")
+    parser.add_argument('--unix-socket-mode', type=parse_mode, default=DEFAULT_MODE, metavar='MODE',
+                        help="Octal permissions of the socket file (default: 660)")
+    args = parser.parse_args()
+    # Resolved before the chdir below
+    unix_socket = os.path.abspath(args.unix_socket) if args.unix_socket else None
+    
     # Change to the resources/public directory where our files are
     public_dir = '/home/uprootiny/enhanced-docs-browser/silver-cljs/resources/public'
     os.chdir(public_dir)
     
-    with socketserver.TCPServer(("0.0.0.0", PORT), SilverCORSHTTPRequestHandler) as httpd:
-        print(f"🌙 Silver Lining ClojureScript serving at http://localhost:{PORT}")
+    if unix_socket:
+        UnixHTTPServer.socket_mode = args.unix_socket_mode
+        httpd = UnixHTTPServer(unix_socket, SilverCORSHTTPRequestHandler)
+        location = f"unix:{unix_socket}"
+    else:
+        httpd = socketserver.TCPServer(("0.0.0.0", PORT), SilverCORSHTTPRequestHandler)
+        location = f"http://localhost:{PORT}"
+    
+    with httpd:
+        print(f"🌙 Silver Lining ClojureScript serving at {location}")
         print(f"📁 Serving from: {os.getcwd()}")
         print("✨ Sophisticated multi-tier semantic exploration ready!")
         print("🎲 With stochastic jitter and entropy-weighted clustering")
@@ -35,8 +35,7 @@ class SilverLining {
         this.setState({ loading: true });
         
         try {
-            const response = await fetch('http://localhost:44500/api/files');
-            const documents = await response.json();
+            const documents = await this.syncDocuments();
             
             const enhancedDocs = documents.map(doc => this.enhanceDocument(doc));
             const clusters = this.createClusters(enhancedDocs);
@@ -56,6 +55,61 @@ class SilverLining {
         }
     }
     
+    async syncDocuments() {
+        // Keep the corpus in IndexedDB and only pull what changed since the last visit
+        if (!window.indexedDB) {
+            return this.fetchAllDocuments();
+        }
+        
+        const db = await this.openDocumentCache();
+        const sync = await this.idbRequest(db.transaction('meta').objectStore('meta').get('sync')) || {};
+        const params = new URLSearchParams({ since: sync.version || 0, epoch: sync.epoch || '' });
+        const response = await fetch(`http://localhost:44500/api/files/changes?${params}`);
+        if (!response.ok) {
+            // e.g. 503 while the server warms up: fall back to a plain full fetch
+            return this.fetchAllDocuments();
+        }
+        const delta = await response.json();
+        
+        const tx = db.transaction(['documents', 'meta'], 'readwrite');
+        const store = tx.objectStore('documents');
+        if (delta.reset) store.clear();
+        delta.changed.forEach(doc => store.put(doc));
+        delta.deleted.forEach(doc => store.delete(doc.id));
+        tx.objectStore('meta').put({ epoch: delta.epoch, version: delta.version }, 'sync');
+        await new Promise((resolve, reject) => {
+            tx.oncomplete = resolve;
+            tx.onerror = () => reject(tx.error);
+        });
+        
+        const documents = await this.idbRequest(db.transaction('documents').objectStore('documents').getAll());
+        return documents.sort((a, b) => a.name.toLowerCase().localeCompare(b.name.toLowerCase()));
+    }
+    
+    async fetchAllDocuments() {
+        const response = await fetch('http://localhost:44500/api/files');
+        if (!response.ok) {
+            throw new Error(`/api/files answered ${response.status}`);
+        }
+        return response.json();
+    }
+    
+    openDocumentCache() {
+        const request = indexedDB.open('silver-lining', 1);
+        request.onupgradeneeded = () => {
+            request.result.createObjectStore('documents', { keyPath: 'id' });
+            request.result.createObjectStore('meta');
+        };
+        return this.idbRequest(request);
+    }
+    
+    idbRequest(request) {
+        return new Promise((resolve, reject) => {
+            request.onsuccess = () => resolve(request.result);
+            request.onerror = () => reject(request.error);
+        });
+    }
+    
     enhanceDocument(doc) {
         const content = doc.content || doc.path || '';
         const concepts = this.extractConcepts(content);
@@ -7,9 +7,11 @@ Tests both the Python main server (44500) and Racket silver lining server (44501
 import pytest
 import requests
 import json
+import re
 import time
 import subprocess
 import os
+import http.client
 from typing import Dict, List, Optional
 
 # Test Configuration
@@ -52,6 +54,34 @@ class TestPythonMainServer:
         response = requests.get(search_url, params={"q": ""}, timeout=TEST_TIMEOUT)
         assert response.status_code == 400
     
+    def test_search_stream(self):
+        """Test that streamed search ends with a summary event"""
+        stream_url = f"{PYTHON_SERVER_URL}/api/search/stream"
+        response = requests.get(stream_url, params={"q": "test"}, timeout=TEST_TIMEOUT)
+        assert response.status_code == 200
+        assert response.headers["Content-Type"].startswith("text/event-stream")
+        
+        events = [block for block in response.text.split("\n\n") if block]
+        assert events[-1].startswith("event: summary")
+        summary = json.loads(events[-1].split("data: ", 1)[1])
+        assert summary["total"] == len(events) - 1
+        assert response.headers["X-Accel-Buffering"] == "no"
+        assert response.headers["Cache-Control"] == "no-cache"
+        
+        if summary["total"] and not summary["truncated"]:
+            # Exactly as many results as the limit is not a truncated list
+            response = requests.get(stream_url, params={"q": "test", "limit": summary["total"]}, timeout=TEST_TIMEOUT)
+            events = [block for block in response.text.split("\n\n") if block]
+            assert json.loads(events[-1].split("data: ", 1)[1])["truncated"] is False
+            if summary["total"] > 1:
+                response = requests.get(stream_url, params={"q": "test", "limit": summary["total"] - 1},
+                                        timeout=TEST_TIMEOUT)
+                events = [block for block in response.text.split("\n\n") if block]
+                assert json.loads(events[-1].split("data: ", 1)[1])["truncated"] is True
+        
+        response = requests.get(stream_url, params={"q": ""}, timeout=TEST_TIMEOUT)
+        assert response.status_code == 400
+    
     def test_files_api(self):
         """Test the files listing API"""
         files_url = f"{PYTHON_SERVER_URL}/api/files"
@@ -68,6 +98,63 @@ class TestPythonMainServer:
             assert "path" in file_obj
             assert file_obj["path"].endswith(".md")
     
+    def test_persistent_connections(self):
+        """Test that buffered, streamed and POST responses all leave the connection reusable"""
+        files = requests.get(f"{PYTHON_SERVER_URL}/api/files", timeout=TEST_TIMEOUT).json()
+        if not files:
+            pytest.skip("No documents to fetch")
+        doc_id = files[0]["id"]
+        host, port = PYTHON_SERVER_URL.split("//")[1].split(":")
+        connection = http.client.HTTPConnection(host, int(port), timeout=TEST_TIMEOUT)
+        
+        connection.request("GET", "/healthz")
+        response = connection.getresponse()
+        body = response.read()
+        assert response.version == 11
+        assert int(response.headers["Content-Length"]) == len(body)
+        sock = connection.sock
+        
+        connection.request("GET", f"/doc/{doc_id}")
+        response = connection.getresponse()
+        assert response.headers["Transfer-Encoding"] == "chunked"
+        assert response.read()
+        
+        connection.request("POST", "/api/batch", body=json.dumps({"documents": [doc_id]}),
+                           headers={"Content-Type": "application/json"})
+        assert connection.getresponse().read()
+        
+        connection.request("GET", f"/doc/{doc_id}/raw")
+        response = connection.getresponse()
+        assert int(response.headers["Content-Length"]) == len(response.read())
+        assert connection.sock is sock
+        connection.close()
+    
+    def test_response_negotiation(self):
+        """Test compact JSON by default, pretty JSON on request and MessagePack by Accept"""
+        files_url = f"{PYTHON_SERVER_URL}/api/files"
+        compact = requests.get(files_url, timeout=TEST_TIMEOUT)
+        pretty = requests.get(files_url, params={"pretty": "1"}, timeout=TEST_TIMEOUT)
+        assert compact.json() == pretty.json()
+        if compact.json():
+            assert len(compact.content) < len(pretty.content)
+        assert compact.headers["Vary"] == "Accept"
+        
+        response = requests.get(files_url, headers={"Accept": "application/msgpack"}, timeout=TEST_TIMEOUT)
+        assert response.status_code == 200
+        if response.headers["Content-Type"] == "application/msgpack":
+            msgpack = pytest.importorskip("msgpack")
+            data = msgpack.unpackb(response.content)
+            assert data["length"] == len(compact.json())
+            assert data["columns"]["path"] == [f["path"] for f in compact.json()]
+        
+        stats_url = f"{PYTHON_SERVER_URL}/api/index-stats"
+        stats = requests.get(stats_url, timeout=TEST_TIMEOUT)
+        stats_pretty = requests.get(stats_url, params={"pretty": "1"}, timeout=TEST_TIMEOUT)
+        assert len(stats.content) < len(stats_pretty.content)
+        assert stats.headers["Vary"] == "Accept"
+        not_pretty = requests.get(stats_url, params={"notpretty": "10"}, timeout=TEST_TIMEOUT)
+        assert b"\n" not in not_pretty.content
+    
     def test_content_analysis_api(self):
         """Test the content analysis and clustering API"""
         analysis_url = f"{PYTHON_SERVER_URL}/api/content-analysis"
@@ -79,7 +166,161 @@ class TestPythonMainServer:
         assert "total_documents" in data
         assert isinstance(data["clusters"], list)
         assert isinstance(data["total_documents"], int)
-    
+
+    def test_corpus_version_header(self):
+        """Test that responses carry the corpus version they were answered from"""
+        response = requests.get(f"{PYTHON_SERVER_URL}/api/files", timeout=TEST_TIMEOUT)
+        assert response.status_code == 200
+        assert "X-Corpus-Version" in response.headers
+        assert int(response.headers["X-Corpus-Version"]) >= 1
+
+    def test_health_and_readiness(self):
+        """Test liveness and readiness probes"""
+        response = requests.get(f"{PYTHON_SERVER_URL}/healthz", timeout=TEST_TIMEOUT)
+        assert response.status_code == 200
+        assert response.json()["status"] == "ok"
+        
+        response = requests.get(f"{PYTHON_SERVER_URL}/readyz", timeout=TEST_TIMEOUT)
+        assert response.status_code in [200, 503]
+        data = response.json()
+        assert "ready" in data
+        assert "index" in data
+
+    def test_index_stats_api(self):
+        """Test the corpus index memory report"""
+        response = requests.get(f"{PYTHON_SERVER_URL}/api/index-stats", timeout=TEST_TIMEOUT)
+        assert response.status_code == 200
+        
+        data = response.json()
+        assert "documents" in data
+        assert "bytes_per_document" in data
+        assert data["total_bytes"] >= data["text_bytes"]
+
+    def test_document_sections_api(self):
+        """Test the section table of contents and single-section fetch"""
+        files = requests.get(f"{PYTHON_SERVER_URL}/api/files", timeout=TEST_TIMEOUT).json()
+        if not files:
+            pytest.skip("No documents to fetch")
+        doc_id = files[0]["id"]
+        
+        response = requests.get(f"{PYTHON_SERVER_URL}/api/doc/{doc_id}/sections", timeout=TEST_TIMEOUT)
+        assert response.status_code == 200
+        data = response.json()
+        assert data["id"] == doc_id
+        assert isinstance(data["sections"], list)
+        
+        if data["sections"]:
+            response = requests.get(f"{PYTHON_SERVER_URL}/api/doc/{doc_id}/section/0", timeout=TEST_TIMEOUT)
+            assert response.status_code == 200
+        
+        response = requests.get(f"{PYTHON_SERVER_URL}/api/doc/{doc_id}/section/99999", timeout=TEST_TIMEOUT)
+        assert response.status_code == 404
+
+    def test_document_id_routes(self):
+        """Test that path URLs redirect to stable /doc/ ids"""
+        files = requests.get(f"{PYTHON_SERVER_URL}/api/files", timeout=TEST_TIMEOUT).json()
+        if files:
+            doc = files[0]
+            
+            response = requests.get(f"{PYTHON_SERVER_URL}/file/{doc['path']}", allow_redirects=False, timeout=TEST_TIMEOUT)
+            assert response.status_code == 301
+            assert response.headers["Location"] == f"/doc/{doc['id']}"
+            
+            response = requests.get(f"{PYTHON_SERVER_URL}/doc/{doc['id']}", timeout=TEST_TIMEOUT)
+            assert response.status_code == 200
+            assert doc["name"] in response.text
+            
+            response = requests.get(f"{PYTHON_SERVER_URL}/raw/{doc['path']}", timeout=TEST_TIMEOUT)
+            assert response.status_code == 200
+            assert response.url.endswith(f"/doc/{doc['id']}/raw")
+        
+        response = requests.get(f"{PYTHON_SERVER_URL}/raw/../../../etc/passwd", timeout=TEST_TIMEOUT)
+        assert response.status_code == 404
+
+    def test_batch_api(self):
+        """Test fetching several documents in one NDJSON response"""
+        files = requests.get(f"{PYTHON_SERVER_URL}/api/files", timeout=TEST_TIMEOUT).json()
+        keys = [f["id"] for f in files[:3]] + ["missing-document"]
+        
+        response = requests.post(f"{PYTHON_SERVER_URL}/api/batch",
+                                 json={"documents": keys, "representations": ["raw", "toc", "features"]},
+                                 timeout=TEST_TIMEOUT)
+        assert response.status_code == 200
+        entries = [json.loads(line) for line in response.text.splitlines()]
+        assert [e["key"] for e in entries] == keys
+        if files:
+            assert "raw" in entries[0] and "toc" in entries[0]
+        assert entries[-1]["error"] == "not found"
+        
+        response = requests.post(f"{PYTHON_SERVER_URL}/api/batch", json={"documents": []}, timeout=TEST_TIMEOUT)
+        assert response.status_code == 400
+        
+        response = requests.post(f"{PYTHON_SERVER_URL}/api/batch",
+                                 json={"documents": keys, "representations": [["raw"]]}, timeout=TEST_TIMEOUT)
+        assert response.status_code == 400
+
+    def test_file_changes_api(self):
+        """Test delta sync: a fresh client is reset, an up-to-date one gets nothing"""
+        changes_url = f"{PYTHON_SERVER_URL}/api/files/changes"
+        response = requests.get(changes_url, timeout=TEST_TIMEOUT)
+        assert response.status_code == 200
+        data = response.json()
+        assert data["reset"] is True
+        assert isinstance(data["changed"], list)
+        if data["changed"]:
+            assert {"id", "path", "name"} <= set(data["changed"][0])
+        
+        params = {"since": data["version"], "epoch": data["epoch"]}
+        response = requests.get(changes_url, params=params, timeout=TEST_TIMEOUT)
+        delta = response.json()
+        assert delta["version"] >= data["version"]
+        if delta["version"] == data["version"]:
+            assert delta["reset"] is False
+            assert delta["changed"] == [] and delta["deleted"] == []
+
+    def test_events_stream(self):
+        """Test that the SSE channel opens with the event-stream content type"""
+        with requests.get(f"{PYTHON_SERVER_URL}/api/events", stream=True, timeout=TEST_TIMEOUT) as response:
+            assert response.status_code == 200
+            assert response.headers["Content-Type"].startswith("text/event-stream")
+            assert next(response.iter_lines(chunk_size=1)) == b"retry: 3000"
+
+    def test_metrics_endpoint(self):
+        """Test the Prometheus metrics exposition"""
+        requests.get(f"{PYTHON_SERVER_URL}/api/files", timeout=TEST_TIMEOUT)
+        response = requests.get(f"{PYTHON_SERVER_URL}/metrics", timeout=TEST_TIMEOUT)
+        assert response.status_code == 200
+        assert response.headers["Content-Type"].startswith("text/plain")
+        
+        text = response.text
+        assert "# TYPE docs_http_request_duration_seconds histogram" in text
+        assert 'docs_http_requests_total{route="/api/files",method="GET",status="200"}' in text
+        assert 'docs_cache_hits_total{cache="render"}' in text
+        assert 'docs_cache_entries{cache="block"}' in text
+        
+        # Every sample line must be name{labels} value, or a scrape fails as a whole
+        sample = re.compile(r'^[a-zA-Z_:][a-zA-Z0-9_:]*(\{[^}]*\})? (\S+)$')
+        for line in text.splitlines():
+            if line.startswith("#"):
+                continue
+            match = sample.match(line)
+            assert match, line
+            float(match.group(2))
+
+    def test_admin_endpoints_require_token(self):
+        """Test that the profiler and memory admin endpoints reject unauthenticated requests"""
+        for endpoint in ["/admin/profile", "/admin/memory"]:
+            response = requests.get(f"{PYTHON_SERVER_URL}{endpoint}", timeout=TEST_TIMEOUT)
+            assert response.status_code in [403, 404]
+        
+        response = requests.post(f"{PYTHON_SERVER_URL}/admin/profile", json={"mode": "sample", "rate": 1},
+                                 timeout=TEST_TIMEOUT)
+        assert response.status_code in [403, 404]
+        
+        response = requests.post(f"{PYTHON_SERVER_URL}/admin/memory", json={"action": "start"},
+                                 timeout=TEST_TIMEOUT)
+        assert response.status_code in [403, 404]
+
     def test_semantic_document_types(self):
         """Test that semantic document classification works"""
         files_url = f"{PYTHON_SERVER_URL}/api/files"
@@ -234,6 +475,419 @@ class TestErrorHandling:
         assert response.status_code in [404, 200]  # Some servers redirect to index
 
 
+class TestBlockRendering:
+    """Block-by-block rendering through the block cache must match a whole-document render"""
+
+    DOCUMENTS = [
+        "# Notes\n\nIntro paragraph.\n\n## Setup\n\nText.\n\n## Setup\n\nAgain.\n\n# Notes\n",
+        "Title\n=====\n\nBody text.\n\nSubtitle\n--------\n\nMore body.\n",
+        "# Code\n\n```python\ndef f():\n\n    return 1\n```\n\n~~~\n# not a heading\n\n~~~\n\nAfter.\n",
+        "# Lists\n\n- one\n- two\n\n  continued\n\n1. first\n2. second\n\n> quoted\n>\n> more\n",
+        "| a | b |\n|---|---|\n| 1 | 2 |\n\n## Table & *emphasis*\n\nText.\n",
+    ]
+    # Documents that must fall back to a single conversion
+    WHOLE_DOCUMENTS = [
+        "# Refs\n\nSee [the docs][docs].\n\n[docs]: https://example.com\n",
+        "[TOC]\n\n# One\n\n## Two\n",
+        "# Html\n\n<div>\n\n*raw*\n\n</div>\n",
+        "See <h2 id=\"keep\">x</h2> here.\n\n# Real\n",
+        "# Real\n\nSee <h2 id=\"keep\">x</h2> here.\n\n# Real\n",
+    ]
+
+    @staticmethod
+    def assert_matches_whole(content):
+        from docs_render import _render_whole, iter_render_blocks, render_blocks, render_sections
+
+        whole_html, whole_headings = _render_whole(content)
+        html, headings = render_blocks(content)
+        assert html == whole_html
+        assert headings == whole_headings
+        assert ''.join(iter_render_blocks(content)) == whole_html
+
+        sections = render_sections(content, min_bytes=0)
+        assert [h for section in sections for h in section['headings']] == whole_headings
+        assert '\n'.join(section['html'] for section in sections) == whole_html
+
+    def test_blocks_match_whole_render(self):
+        """Cold and warm block renders equal the whole render, duplicate heading ids included"""
+        for content in self.DOCUMENTS + self.WHOLE_DOCUMENTS:
+            self.assert_matches_whole(content)
+            self.assert_matches_whole(content)
+
+    def test_inline_heading_tags_are_not_toc_headings(self):
+        """Blocks whose heading tags do not match the toc are never split or cached"""
+        import docs_render
+
+        content = "See <h2 id=\"keep\">x</h2> here.\n\n# Real\n"
+        assert docs_render._render_spans(content, docs_render.block_spans(content)) is None
+
+    def test_section_layout_renders_only_heading_blocks(self, monkeypatch):
+        """Laying out sections converts heading blocks only and merges small sections"""
+        import docs_render
+
+        monkeypatch.setattr(docs_render, 'block_cache', docs_render.LRUCache(1000))
+        content = ''.join(f"## Part {i % 7}\n\n{'Paragraph text. ' * 20}\n\n" for i in range(60))
+        sections = docs_render.section_layout(content, min_bytes=2048)
+        assert len(docs_render.block_cache) == 7
+        assert len(sections) > 1
+        assert all(s['end'] - s['start'] >= 2048 for s in sections[:-1])
+        assert [h['id'] for s in sections for h in s['headings']] == \
+            [h['id'] for h in docs_render._render_whole(content)[1]]
+        html = [docs_render.render_section(content, sections, n) for n in range(len(sections))]
+        assert '\n'.join(html) == docs_render._render_whole(content)[0]
+
+    def test_more_blocks_than_cache(self, monkeypatch):
+        """A document with more uncached blocks than the cache holds still renders"""
+        import docs_render
+
+        monkeypatch.setattr(docs_render, 'block_cache', docs_render.LRUCache(4))
+        content = '\n\n'.join(f"## Part {i}\n\nParagraph {i}." for i in range(20)) + '\n'
+        self.assert_matches_whole(content)
+        assert len(docs_render.block_cache) == 4
+
+
+class TestHighlightCache:
+    """Code blocks are highlighted once per (lexer, code) and reused across renders"""
+
+    def test_edited_fence_is_the_only_one_highlighted(self, monkeypatch):
+        import docs_render
+
+        monkeypatch.setattr(docs_render, "highlight_cache", docs_render.LRUCache(64))
+        fences = ["def first():\n    return 1", "SELECT id FROM docs;", "echo third"]
+        languages = ["python", "sql", "sh"]
+        document = lambda codes: "# Snippets\n\n" + "\n\n".join(
+            f"```{lang}\n{code}\n```" for lang, code in zip(languages, codes)) + "\n"
+        cache = docs_render.highlight_cache
+
+        docs_render.create_markdown().convert(document(fences))
+        assert (cache.hits, cache.misses) == (0, 3)
+
+        fences[1] = "SELECT id, name FROM docs;"
+        html = docs_render.create_markdown().convert(document(fences))
+        assert (cache.hits, cache.misses) == (2, 4)
+        assert "name" in html and "first" in html
+
+
+class TestIndexSnapshot:
+    """Index snapshots round-trip exactly and unusable files are rejected, never half-loaded"""
+
+    @staticmethod
+    def write(tmp_path):
+        from docs_index import DocumentStore, write_snapshot
+
+        root = str(tmp_path)
+        store = DocumentStore()
+        for i in range(5):
+            store.append(os.path.join(root, "notes", f"doc{i}.md"), 1700000000.25 + i, 20 + i,
+                         "technical", f"# Document {i}\n\nnaïve café {i}\n".encode("utf-8"))
+        path = str(tmp_path / "index.bin")
+        write_snapshot(path, root, 7, store)
+        return root, path, store
+
+    def test_round_trip(self, tmp_path):
+        from docs_index import IndexGeneration, read_snapshot
+
+        root, path, store = self.write(tmp_path)
+        version, loaded, _ = read_snapshot(path, root)
+        assert version == 7
+        # Ids are assigned when a generation is built from the store
+        IndexGeneration(1, store, root)
+        IndexGeneration(version, loaded, root)
+        fields = lambda doc: (doc.path, doc.id, doc.name, doc.mtime, doc.size, doc.type, doc.content)
+        assert [fields(doc) for doc in loaded] == [fields(doc) for doc in store]
+        assert read_snapshot(path, root + "-elsewhere") is None
+
+    def test_unusable_files_return_none(self, tmp_path):
+        from docs_index import read_snapshot
+
+        root, path, _ = self.write(tmp_path)
+        data = open(path, "rb").read()
+        broken = tmp_path / "broken.bin"
+        for content in (b"", data[:4], data[:20], data[:len(data) // 2], data[:-1],
+                        b"NOTINDEX" + data[8:]):
+            broken.write_bytes(content)
+            assert read_snapshot(str(broken), root) is None
+        assert read_snapshot(str(tmp_path / "missing.bin"), root) is None
+
+
+class TestIndexChangeLog:
+    """The index change log reports additions, modifications and deletions between versions"""
+
+    def test_added_changed_deleted(self, tmp_path):
+        from docs_index import IndexManager
+
+        (tmp_path / "kept.md").write_text("# Kept\n")
+        (tmp_path / "edited.md").write_text("# Edited\n")
+        (tmp_path / "removed.md").write_text("# Removed\n")
+        index = IndexManager(str(tmp_path))
+        index.rebuild()
+        first = index.version
+
+        (tmp_path / "edited.md").write_text("# Edited\n\nMore text.\n")
+        (tmp_path / "removed.md").unlink()
+        (tmp_path / "new.md").write_text("# New\n")
+        index.rebuild()
+        changes = index.changes_since(first, index.version)
+        assert changes == {
+            str(tmp_path / "edited.md"): "changed",
+            str(tmp_path / "removed.md"): "deleted",
+            str(tmp_path / "new.md"): "added",
+        }
+
+        (tmp_path / "new.md").write_text("# New\n\nEdited right after.\n")
+        index.rebuild()
+        assert index.changes_since(first, index.version)[str(tmp_path / "new.md")] == "added"
+        assert index.changes_since(first + 1, index.version) == {str(tmp_path / "new.md"): "changed"}
+
+    def test_sync_state_survives_restart(self, tmp_path):
+        """A restarted index keeps its epoch and change log, so synced clients get deltas"""
+        from docs_index import IndexManager
+
+        root = tmp_path / "docs"
+        root.mkdir()
+        (root / "a.md").write_text("# A\n")
+        snapshot = str(tmp_path / "index.bin")
+        index = IndexManager(str(root), snapshot_path=snapshot)
+        index.rebuild()
+        first = index.version
+        (root / "b.md").write_text("# B\n")
+        index.rebuild()
+
+        restarted = IndexManager(str(root), snapshot_path=snapshot)
+        assert restarted.load_snapshot()
+        assert restarted.epoch == index.epoch
+        assert restarted.changes_since(first, restarted.version) == {str(root / "b.md"): "added"}
+
+
+class TestPrerender:
+    """Pre-rendering fills the render cache with every document served whole"""
+
+    def test_fills_render_cache(self, tmp_path, monkeypatch):
+        import docs_render
+
+        monkeypatch.setattr(docs_render, "render_cache", docs_render.RenderCache())
+        small = [str(tmp_path / f"note{i}.md") for i in range(3)]
+        for i, path in enumerate(small):
+            with open(path, "w", encoding="utf-8") as f:
+                f.write(f"# Note {i}\n\n```python\nprint({i})\n```\n")
+        large = str(tmp_path / "large.md")
+        with open(large, "w", encoding="utf-8") as f:
+            f.write("# Large\n\n" + "Filler text for a lazily served document.\n\n" * 8000)
+        assert os.path.getsize(large) > docs_render.LAZY_SECTION_BYTES
+
+        result = docs_render.prerender(small + [large], workers=1)
+        assert (result["done"], result["failed"], result["total"]) == (3, 0, 3)
+        for path in small:
+            stat = os.stat(path)
+            html = docs_render.render_cache.get(path, stat.st_mtime, stat.st_size)
+            assert html == docs_render.render_blocks(open(path, encoding="utf-8").read())[0]
+        assert large not in docs_render.render_cache
+
+
+class TestStaticExport:
+    """The static export writes every page under its canonical URL and skips unchanged sources"""
+
+    def test_export_and_incremental_rerun(self, tmp_path):
+        import gzip
+        from docs_export import export_site
+        from docs_index import document_id
+
+        root = tmp_path / "docs"
+        (root / "guides").mkdir(parents=True)
+        (root / "index.md").write_text("# Index\n\nWelcome.\n")
+        (root / "guides" / "setup.md").write_text("# Setup\n\n```sh\nmake\n```\n")
+        out = tmp_path / "site"
+
+        first = export_site(str(root), str(out), workers=1)
+        assert (first["rendered"], first["failed"]) == (2, 0)
+        for relative in ("index.md", os.path.join("guides", "setup.md")):
+            page = out / "doc" / (document_id(relative) + ".html")
+            html = page.read_bytes()
+            assert b"<!DOCTYPE html>" in html
+            assert gzip.decompress((out / "doc" / (document_id(relative) + ".html.gz")).read_bytes()) == html
+            assert (out / (relative + ".html")).read_bytes() == html
+
+        second = export_site(str(root), str(out), workers=1)
+        assert (second["rendered"], second["unchanged"]) == (0, 2)
+
+        (root / "index.md").write_text("# Index\n\nEdited.\n")
+        third = export_site(str(root), str(out), workers=1)
+        assert (third["rendered"], third["unchanged"]) == (1, 1)
+
+
+class TestBenchmarkCorpus:
+    """The benchmark corpus generator must be reproducible for results to be comparable"""
+
+    def test_corpus_is_deterministic(self, tmp_path):
+        """Same seed gives byte-identical corpora; a different seed does not"""
+        from docs_bench import CorpusGenerator
+
+        first = CorpusGenerator(seed=7).generate(str(tmp_path / 'a'), 30)
+        second = CorpusGenerator(seed=7).generate(str(tmp_path / 'b'), 30)
+        assert first == second
+
+        relpath = CorpusGenerator.relative_path(12)
+        text = (tmp_path / 'a' / relpath).read_text()
+        assert text == (tmp_path / 'b' / relpath).read_text()
+        assert text.startswith('# ') and '\n## ' in text
+        assert CorpusGenerator(seed=8).document(12, []) != CorpusGenerator(seed=7).document(12, [])
+
+
+class TestBenchmarkComparison:
+    """The regression gate flags significant slowdowns beyond the threshold and nothing else"""
+
+    @staticmethod
+    def results(scale):
+        from docs_bench import summarize
+
+        samples = [1.0 + (i % 10) / 10 for i in range(50)]
+        endpoint = {'warm': summarize([s * scale for s in samples], 0, 1.0)}
+        return {'runs': [{'documents': 1000, 'endpoints': {'doc': endpoint}}]}
+
+    def test_flags_only_real_regressions(self):
+        from docs_bench import compare_results
+
+        baseline = self.results(1.0)
+        assert compare_results(baseline, self.results(1.0))[0]['verdict'] == 'ok'
+        assert compare_results(baseline, self.results(1.05), threshold=10)[0]['verdict'] == 'ok'
+        assert compare_results(baseline, self.results(1.5), threshold=10)[0]['verdict'] == 'REGRESSION'
+        assert compare_results(baseline, self.results(0.5), threshold=10)[0]['verdict'] == 'improved'
+
+
+class TestLoadHistogram:
+    """Percentiles from the load generator's histogram keep three significant digits"""
+
+    def test_percentiles_within_precision(self):
+        from docs_load import LatencyHistogram
+
+        histogram = LatencyHistogram(digits=3)
+        for micros in range(1, 100001):
+            histogram.record(micros / 1_000_000)
+        for p, expected_ms in ((50, 50.0), (90, 90.0), (99, 99.0), (100, 100.0)):
+            assert abs(histogram.percentile(p) - expected_ms) <= expected_ms * 0.001
+
+        other = LatencyHistogram(digits=3)
+        other.record(2.5)
+        histogram.merge(other)
+        assert histogram.total == 100001
+        assert histogram.percentile(100) == 2500.0
+
+
+class TestLoadGenerator:
+    """Requests the service never answered still count against it"""
+
+    def test_unfinished_requests_are_counted(self):
+        import asyncio
+        import docs_load
+
+        async def slow(reader, writer):
+            await reader.readuntil(b"\r\n\r\n")
+            await asyncio.sleep(0.2)
+            writer.write(b"HTTP/1.1 200 OK\r\nContent-Length: 2\r\nConnection: close\r\n\r\nok")
+            await writer.drain()
+            writer.close()
+
+        async def run():
+            server = await asyncio.start_server(slow, "127.0.0.1", 0)
+            port = server.sockets[0].getsockname()[1]
+            mix = docs_load.RequestMix([(1, "GET", "/")], [], ["x"])
+            async with server:
+                return await docs_load.drive(docs_load.Target(f"http://127.0.0.1:{port}"), mix, rate=50,
+                                             duration=0.5, connections=2, timeout=0.3, warmup=0)
+
+        result = asyncio.run(run())
+        assert result["unfinished"] > 0
+        assert 24 <= result["requests"] <= 26
+        assert result["corrected"]["count"] == result["requests"] - result["errors"] + result["timeouts"] + result["unfinished"]
+
+
+class TestSlowLog:
+    """Requests over the slow threshold are logged as one JSON line with their stage breakdown"""
+
+    def test_slow_request_is_logged(self, tmp_path, monkeypatch):
+        import threading
+        import docs_timing
+        import enhanced_docs_server as server
+        from docs_index import IndexManager, document_id
+
+        root = tmp_path / "docs"
+        root.mkdir()
+        (root / "guide.md").write_text("# Guide\n\n```python\nprint('slow')\n```\n")
+        index = IndexManager(str(root))
+        index.rebuild()
+        monkeypatch.setattr(server, "corpus_index", index)
+        page = "/doc/" + document_id("guide.md")
+        log_path = tmp_path / "slow.jsonl"
+        monkeypatch.setattr(docs_timing, "slow_log", docs_timing.SlowLog(str(log_path), 0))
+
+        httpd = server.DocsHTTPServer(("127.0.0.1", 0), server.EnhancedDocsHandler)
+        threading.Thread(target=httpd.serve_forever, daemon=True).start()
+        try:
+            connection = http.client.HTTPConnection("127.0.0.1", httpd.server_address[1], timeout=TEST_TIMEOUT)
+            connection.request("GET", page)
+            response = connection.getresponse()
+            response.read()
+            assert response.status == 200
+            connection.close()
+        finally:
+            httpd.shutdown()
+            httpd.server_close()
+
+        deadline = time.time() + 5
+        while docs_timing.slow_log.written < 1 and time.time() < deadline:
+            time.sleep(0.01)
+        lines = log_path.read_text().splitlines()
+        assert len(lines) == 1
+        record = json.loads(lines[0])
+        assert (record["method"], record["path"], record["status"]) == ("GET", page, 200)
+        assert {"file_io", "markdown", "write", "other"} <= set(record["stages_ms"])
+        assert record["duration_ms"] >= sum(record["stages_ms"].values()) - 0.1
+
+
+class TestUnixSocketListener:
+    """Unix socket listeners take the requested mode and never replace a live socket"""
+
+    def test_bind_mode_and_stale_sockets(self, tmp_path):
+        import socket
+        import stat
+        import threading
+        from http.server import HTTPServer, BaseHTTPRequestHandler
+        from unix_socket import UnixServerMixin
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                self.send_response(200)
+                self.send_header("Content-Length", "2")
+                self.end_headers()
+                self.wfile.write(b"ok")
+
+        class UnixHTTPServer(UnixServerMixin, HTTPServer):
+            socket_mode = 0o640
+
+        path = str(tmp_path / "docs.sock")
+        stale = socket.socket(socket.AF_UNIX)
+        stale.bind(path)
+        stale.close()  # Leaves a socket file nobody listens on
+
+        server = UnixHTTPServer(path, Handler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        try:
+            assert stat.S_IMODE(os.stat(path).st_mode) == 0o640
+            client = socket.socket(socket.AF_UNIX)
+            client.connect(path)
+            client.sendall(b"GET / HTTP/1.0\r\n\r\n")
+            assert client.recv(4096).startswith(b"HTTP/1.0 200")
+            client.close()
+
+            with pytest.raises(OSError):
+                UnixHTTPServer(path, Handler)
+            assert os.path.exists(path)
+        finally:
+            server.shutdown()
+            server.server_close()
+        assert not os.path.exists(path)
+
+
 def run_server_diagnostics():
     """Run diagnostic checks on the servers"""
     print("🔍 Running server diagnostics...")
@@ -0,0 +1,93 @@
+"""
+Unix domain socket listeners for the services fronted by the local nginx.
+The nginx -> backend hop skips the TCP stack, and who may connect is decided
+by the socket file's owner, group and mode rather than by firewall rules.
+"""
+
+import errno
+import os
+import socket
+import stat
+
+DEFAULT_MODE = 0o660  # Owner and group (e.g. www-data for nginx) may connect
+
+
+def parse_mode(value: str) -> int:
+    """argparse type for octal permission strings such as 660"""
+    return int(value, 8)
+
+
+def remove_stale_socket(path: str):
+    """Unlink a socket file left behind by a previous run; refuse to touch live sockets or other files"""
+    try:
+        mode = os.lstat(path).st_mode
+    except FileNotFoundError:
+        return
+    if not stat.S_ISSOCK(mode):
+        raise OSError(errno.EEXIST, f"{path} exists and is not a socket")
+
+    probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        probe.connect(path)
+    except (ConnectionRefusedError, FileNotFoundError):
+        os.unlink(path)
+        return
+    finally:
+        probe.close()
+    raise OSError(errno.EADDRINUSE, f"{path} is in use by a running server")
+
+
+def unlink_socket(path: str):
+    """Remove a socket file on shutdown; it may already be gone"""
+    try:
+        os.unlink(path)
+    except FileNotFoundError:
+        pass
+
+
+def bind_path(sock: socket.socket, path: str, mode: int = DEFAULT_MODE):
+    """Bind sock to path so that it is never reachable with looser permissions than mode"""
+    remove_stale_socket(path)
+    previous = os.umask(0o777 & ~mode)
+    try:
+        sock.bind(path)
+    finally:
+        os.umask(previous)
+    os.chmod(path, mode)
+
+
+def bind_unix_socket(path: str, mode: int = DEFAULT_MODE, backlog: int = 128) -> socket.socket:
+    """Listening Unix socket at path, e.g. to hand to uvicorn as fd="""
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        bind_path(sock, path, mode)
+        sock.listen(backlog)
+    except OSError:
+        sock.close()
+        raise
+    return sock
+
+
+class UnixServerMixin:
+    """Listen on a Unix socket path instead of a TCP address; mix in before a socketserver class"""
+    address_family = socket.AF_UNIX
+    socket_mode = DEFAULT_MODE
+    bound = False
+
+    def server_bind(self):
+        bind_path(self.socket, self.server_address, self.socket_mode)
+        self.bound = True
+        # Read by http.server handlers in place of a host and port
+        self.server_name = 'localhost'
+        self.server_port = 0
+
+    def get_request(self):
+        request, _ = self.socket.accept()
+        # Unix peers have no address; handlers still log client_address[0]
+        return request, ('unix', 0)
+
+    def server_close(self):
+        super().server_close()
+        # Also called when binding failed, when the path may belong to another server
+        if self.bound:
+            unlink_socket(self.server_address)